@@ -0,0 +1,81 @@
+"""Backtest à origine glissante et recherche des ordres SARIMAX par série.
+
+    python backtest.py [--workers N] [--departments 75 13 ...] [--transforms log log1p ...]
+
+La grille (modèles x séries) est répartie sur un pool de processus. Les
+résultats déjà calculés pour la même version des données sont réutilisés
+(``backtests.parquet``). Le meilleur modèle de chaque série est écrit dans
+``best_models.parquet``, lu par le tableau de bord et par
+``forecast_batch.py``.
+"""
+from opencovid import parallel
+
+parallel.limit_blas_threads()  # avant numpy
+
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from opencovid import backtest, forecast
+from opencovid.data import load_data
+from opencovid.geo import DEPARTMENTS
+
+KEY = ['series', 'version', 'model', 'origins', 'step']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--departments', nargs='+', default=list(DEPARTMENTS))
+    parser.add_argument('--transforms', nargs='+', default=list(forecast.TRANSFORMS), choices=list(forecast.TRANSFORMS))
+    parser.add_argument('--origins', type=int, default=backtest.ORIGINS)
+    parser.add_argument('--step', type=int, default=backtest.STEP)
+    parser.add_argument('--metric', default=backtest.METRIC)
+    parser.add_argument('--store', default=forecast.STORE_DIR)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    cube = load_data().cube
+    series = [('France', forecast.national_series(cube))]
+    series += [(dep, forecast.department_series(cube, dep)) for dep in args.departments if dep in cube.dep_codes]
+    versions = {name: forecast.data_version(p)[0] for name, p in series}
+
+    # résultats des lancements précédents
+    path = os.path.join(args.store, 'backtests.parquet')
+    previous = pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame(columns=KEY)
+    done = set(map(tuple, previous[KEY].astype(str).values))
+
+    tasks = [(name, p, spec) for name, p in series for spec in backtest.grid(args.transforms)
+             if (name, versions[name], forecast.spec_key(spec), str(args.origins), str(args.step)) not in done]
+    logging.info('%d évaluations à faire (%d déjà en cache)', len(tasks), len(series) * len(backtest.grid(args.transforms)) - len(tasks))
+
+    t = time.perf_counter()
+    rows = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(backtest.evaluate, name, p, spec, args.origins, args.step) for name, p, spec in tasks]
+        for i, future in enumerate(as_completed(futures), 1):
+            rows.append(future.result())
+            if i % 50 == 0 or i == len(futures):
+                elapsed = time.perf_counter() - t
+                logging.info('%d/%d évaluations (%.1f/s)', i, len(futures), i / elapsed)
+
+    results = pd.concat([previous, pd.DataFrame(rows)], ignore_index=True) if rows else previous
+    os.makedirs(args.store, exist_ok=True)
+    forecast.write_parquet(results, path)
+
+    # meilleur modèle par série, sur la version courante des données
+    current = results[results['series'].map(versions) == results['version']]
+    best = backtest.best_models(current, args.metric)
+    best_path = os.path.join(args.store, 'best_models.parquet')
+    forecast.write_parquet(best, best_path)
+    stopped = int((~pd.DataFrame(rows)['converged']).sum()) if rows else 0
+    logging.info('%d modèles retenus, %d évaluations arrêtées tôt, %.1f s -> %s',
+                 len(best), stopped, time.perf_counter() - t, best_path)
+
+
+if __name__ == '__main__':
+    main()
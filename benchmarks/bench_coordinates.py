@@ -0,0 +1,55 @@
+"""Benchmark de l'enrichissement GPS : boucles par zone vs jointure.
+
+    python -m benchmarks.bench_coordinates [--scales 1 10]
+"""
+import argparse
+import time
+
+from benchmarks import synthetic
+from opencovid.geo import GPS, GPS_DEP, add_coordinates, d_gps, depts
+
+
+def loop_chiffres_cles(df0):
+    # ancienne version de load_data(), conservée pour comparaison
+    for area in df0['maille_nom'].unique():
+        dfd = df0.copy()
+        mask = (dfd['maille_nom'] == area)
+        df0.loc[mask,'lat'] = d_gps[area][0]
+        df0.loc[mask,'lon'] = d_gps[area][1]
+    return df0
+
+
+def loop_sidep_dep(df):
+    for x in depts.keys():
+        dfd = df.copy()
+        mask = (dfd['dep'] == depts[x])
+        df.loc[mask,'lat'] = d_gps[x][0]
+        df.loc[mask,'lon'] = d_gps[x][1]
+    return df
+
+
+def _time(fn, df):
+    t = time.perf_counter()
+    fn(df.copy())
+    return time.perf_counter() - t
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10])
+    args = parser.parse_args()
+
+    cases = [
+        ('chiffres-cles', synthetic.chiffres_cles, loop_chiffres_cles, lambda df: add_coordinates(df, 'maille_nom', GPS)),
+        ('sidep-quot-dep', synthetic.sidep_quot_dep, loop_sidep_dep, lambda df: add_coordinates(df, 'dep', GPS_DEP)),
+    ]
+    print('%-16s %6s %10s %10s %10s %8s' % ('source', 'échelle', 'lignes', 'boucle(s)', 'jointure(s)', 'gain'))
+    for name, make, loop, join in cases:
+        for scale in args.scales:
+            df = make(scale)
+            t_loop, t_join = _time(loop, df), _time(join, df)
+            print('%-16s %6g %10d %10.3f %10.3f %7.0fx' % (name, scale, len(df), t_loop, t_join, t_loop / t_join))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Taille et durée de construction des graphiques de Tendances, pleine résolution vs réduits.
+
+    python -m benchmarks.bench_downsample [--scales 1 10] [--points 300] [--repeat 3]
+
+La durée mesurée est celle de la construction plotly et de la sérialisation
+JSON côté serveur ; le rendu dans le navigateur croît avec la taille envoyée.
+"""
+import argparse
+import time
+
+import plotly.express as px
+
+from benchmarks import synthetic
+from opencovid import downsample
+from opencovid.aggregates import TestingCube
+from opencovid.data import _prepare_chiffres_cles, _prepare_sidep_quot_dep
+
+AREA, DEP = 'Paris', '75'
+
+
+def figures(df, cube, reduce, n):
+    """Graphiques longs de Tendances ; `reduce` applique la réduction à `n` points."""
+    bars = (lambda d, x, y: downsample.bars(d, x, y, n)) if reduce else (lambda d, x, y: d)
+    lines = (lambda d, x, y, **k: downsample.lines(d, x, y, n=n, **k)) if reduce else (lambda d, x, y, **k: d)
+    df_area = df[df['maille_nom'] == AREA]
+    df2 = df_area.melt(id_vars='date', value_vars=['deces','hospitalises'])
+    by_age = cube.department_by_age(DEP)
+    return {
+        'f0 (P France)': lambda: px.bar(bars(cube.national('P'), 'jour', 'P'), x='jour', y='P'),
+        'fig2 (décès, hosp.)': lambda: px.line(lines(df2, 'date', 'value', color='variable'),
+                                               x='date', y='value', color='variable'),
+        'fig3 (réanimation)': lambda: px.line(lines(df_area, 'date', 'reanimation'), x='date', y='reanimation'),
+        'fig5 (T par âge)': lambda: px.bar(bars(by_age, 'jour', 'T'), x='jour', y='T', color='cl_age90'),
+    }
+
+
+def _measure(build, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter()
+        payload = build().to_json()
+        best = min(best, time.perf_counter() - t)
+    return len(payload), best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10])
+    parser.add_argument('--points', type=int, default=downsample.POINTS)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for scale in args.scales:
+        df = _prepare_chiffres_cles(synthetic.chiffres_cles(scale))
+        cube = TestingCube(_prepare_sidep_quot_dep(synthetic.sidep_quot_dep(scale)))
+        full, reduced = figures(df, cube, False, args.points), figures(df, cube, True, args.points)
+        print('échelle %g (%d jours), %d points par trace' % (scale, int(synthetic.DAYS * scale), args.points))
+        print('  %-20s %10s %10s %10s %10s' % ('graphique', 'plein(Ko)', 'réduit(Ko)', 'plein(ms)', 'réduit(ms)'))
+        for name in full:
+            (b_full, t_full), (b_red, t_red) = _measure(full[name], args.repeat), _measure(reduced[name], args.repeat)
+            print('  %-20s %10.0f %10.0f %10.1f %10.1f' % (name, b_full / 1024, b_red / 1024, t_full * 1e3, t_red * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""Benchmark du rendu des sections : groupby à chaque rendu vs TestingCube.
+
+    python -m benchmarks.bench_sections [--scales 1 10] [--repeat 3] [--sections Indicateurs ...]
+
+Chaque section est rendue comme dans ``st_app.py`` avant et après
+l'introduction de ``TestingCube`` : agrégats SI-DEP (groupby sur `df_dep`,
+ou lecture du cube), puis construction des figures plotly et leur
+sérialisation JSON, comme par ``st.plotly_chart``. Seul l'affichage par le
+navigateur n'est pas mesuré. Les jeux de données sont chargés par la suite
+complète (``benchmarks/run.py``), depuis les fichiers synthétiques.
+
+Les colonnes « agrégats » ne mesurent que les calculs sur `df_dep` ; le
+rendu complet des Prédictions est dominé par l'ajustement SARIMAX.
+"""
+import argparse
+import shutil
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from benchmarks import run
+from opencovid import data
+from opencovid.aggregates import TestingCube
+
+AREA = 'Paris'
+CENTER = {'lat': 48.862725, 'lon': 2.287592}
+
+
+# agrégats SI-DEP de chaque section : avant (groupby à chaque rendu) et après (cube) ; observed=True
+# car les colonnes n'étaient pas encore catégorielles
+
+def old_indicateurs(df_dep, dep):
+    national = df_dep.groupby('jour', observed=True)['P'].sum().reset_index()
+    for _ in range(2):  # valeur, titre et référence recalculés séparément
+        df_dep.groupby('jour', observed=True)['P'].sum().reset_index()
+    df_dep_area = df_dep[df_dep['dep'] == dep]
+    tested = df_dep_area.groupby(['jour','cl_age90'], observed=True)['T'].sum().reset_index()
+    pos = df_dep_area.groupby(['jour','cl_age90'], observed=True)['P'].sum().reset_index()
+    return {'national': national, 'tested': tested, 'pos': pos}
+
+
+def new_indicateurs(cube, dep):
+    by_age = cube.department_by_age(dep)
+    return {'national': cube.national('P'), 'tested': by_age, 'pos': by_age}
+
+
+def old_tendances(df_dep, dep):
+    df_dep_area = df_dep[df_dep['dep'] == dep]
+    return {'P': df_dep.groupby('jour', observed=True)['P'].sum().reset_index(),
+            'T': df_dep.groupby('jour', observed=True)['T'].sum().reset_index(),
+            'tested': df_dep_area.groupby(['jour','cl_age90'], observed=True)['T'].sum().reset_index(),
+            'pos': df_dep_area.groupby(['jour','cl_age90'], observed=True)['P'].sum().reset_index()}
+
+
+def new_tendances(cube, dep):
+    by_age = cube.department_by_age(dep)
+    return {'P': cube.national('P'), 'T': cube.national('T'), 'tested': by_age, 'pos': by_age}
+
+
+def old_predictions(df_dep, dep):
+    return {'national': df_dep.groupby('jour', observed=True)['P'].sum().reset_index(),
+            'area': df_dep[df_dep['dep'] == dep].groupby('jour', observed=True)['P'].sum().reset_index()}
+
+
+def new_predictions(cube, dep):
+    return {'national': cube.national('P').copy(), 'area': cube.department(dep)[['P']].reset_index()}
+
+
+def old_cartes(df_dep, dep):
+    last_day = df_dep.groupby('jour', observed=True)['P'].sum().reset_index().tail(1)['jour'].values[0]
+    df_dep.groupby('jour', observed=True)['P'].sum().reset_index()  # date de fin
+    departments = df_dep.groupby(['jour','dep','lat','lon'], observed=True)['P'].sum().reset_index()
+    return {'last_day': last_day, 'departments': departments}
+
+
+def new_cartes(cube, dep):
+    return {'last_day': cube.last_day, 'departments': cube.departments}
+
+
+# figures de chaque section, identiques avant et après ; renvoie le nombre d'octets sérialisés
+
+def _serialize(figures):
+    return sum(len(fig.to_json()) for fig in figures)
+
+
+def _indicator(frame, col, title, **kwargs):
+    # dernière valeur renseignée et précédente (les fichiers synthétiques ont des trous)
+    values = frame[col].dropna()
+    return go.Figure(go.Indicator(mode=kwargs.pop('mode', 'number+delta'), value=float(values.iat[-1]),
+                                  title={'text': title}, delta={'reference': float(values.iat[-2])}, **kwargs))
+
+
+def _gauge():
+    return {'axis': {'range': [None, 160]},
+            'steps': [{'range': [0, 10], 'color': 'lightgray'}, {'range': [10, 50], 'color': 'gray'},
+                      {'range': [50, 100], 'color': 'orange'}],
+            'threshold': {'line': {'color': 'red', 'width': 4}, 'thickness': 0.75, 'value': 50}}
+
+
+def render_indicateurs(d, tables):
+    df_france = d.df[d.df['maille_nom'] == 'France']
+    df_area = d.df[d.df['maille_nom'] == AREA]
+    tid_dep = d.df_tid_dep[d.df_tid_dep['dep'] == d.depts[AREA]]
+    figures = [_indicator(df_france, col, col) for col in ('nouvelles_hospitalisations', 'nouvelles_reanimations')]
+    figures.append(_indicator(d.df_tid, 'tx_id', "Taux d'incidence", mode='gauge+number+delta', gauge=_gauge()))
+    figures.append(_indicator(tid_dep, 'tx_id', AREA, mode='gauge+number+delta', gauge=_gauge()))
+    figures += [_indicator(df_area, col, col)
+                for col in ('deces', 'nouvelles_hospitalisations', 'nouvelles_reanimations')]
+    figures += [_indicator(frame, col, str(frame.tail(1)['jour'].values[0]))
+                for frame, col in ((tables['national'], 'P'), (tables['tested'], 'T'), (tables['pos'], 'P'))]
+    return _serialize(figures)
+
+
+def render_tendances(d, tables):
+    df_area = d.df[d.df['maille_nom'] == AREA]
+    df1 = df_area.tail(10).melt(id_vars='date', value_vars=['nouvelles_hospitalisations', 'nouvelles_reanimations'])
+    df2 = df_area.melt(id_vars='date', value_vars=['deces', 'hospitalises'])
+    d.df_dep[d.df_dep['dep'] == d.depts[AREA]].head().to_json()  # st.write(df_dep_area.head())
+    return _serialize([px.bar(tables['P'], x='jour', y='P'), px.bar(tables['T'], x='jour', y='T'),
+                       px.line(df1, x='date', y='value', color='variable'),
+                       px.line(df2, x='date', y='value', color='variable'),
+                       px.line(df_area, x='date', y='reanimation'),
+                       px.bar(data_frame=tables['tested'], x='jour', y='T', color='cl_age90'),
+                       px.bar(data_frame=tables['pos'], x='jour', y='P', color='cl_age90')])
+
+
+def _sarimax(p, order, seasonal_order, **kwargs):
+    import statsmodels.api as sm
+    p['jour'] = pd.to_datetime(p['jour'])
+    p = p.set_index('jour').dropna()
+    p_log = np.log(p).dropna()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        sarima = sm.tsa.SARIMAX(p_log.squeeze(), order=order, seasonal_order=seasonal_order, **kwargs).fit(disp=False)
+    pred = np.exp(sarima.predict(433, 463))
+    return px.line(pd.concat([p, pred]).rename(columns={'P': 'Cas Positifs', 0: 'Prédictions'}))
+
+
+def render_predictions(d, tables):
+    p2 = tables['area']
+    p2['P'] = (p2['P'] * 100).replace(0, 1)
+    return _serialize([_sarimax(tables['national'], (4, 0, 2), (4, 0, 2, 7), enforce_stationarity=False,
+                                enforce_invertibility=False, trend='n'),
+                       _sarimax(p2, (1, 0, 2), (1, 0, 1, 7))])
+
+
+def render_cartes(d, tables):
+    last_week = d.df_tid_dep['semaine_glissante'].values[-1]
+    date = pd.to_datetime(tables['last_day'])  # dates de début et de fin par défaut
+    figures = [px.scatter_mapbox(d.df_tid_dep[d.df_tid_dep['semaine_glissante'] == last_week], lat='lat', lon='lon',
+                                 size='tx_id', hover_name='tx_id', color='tx_id', zoom=4, center=CENTER, height=800,
+                                 mapbox_style='open-street-map')]
+    df_anim = d.df_depts.assign(dt_str=d.df_depts['date'].apply(lambda x: x.strftime('%d-%b-%Y')))
+    df_anim = df_anim[(df_anim['date'] >= date) & (df_anim['date'] <= date)]
+    figures.append(px.scatter_mapbox(df_anim, lat='lat', lon='lon', size='nouvelles_hospitalisations',
+                                     hover_name='maille_nom', animation_frame='dt_str', zoom=4, center=CENTER,
+                                     height=800, mapbox_style='open-street-map'))
+    df_anim2 = tables['departments']
+    jours = pd.to_datetime(df_anim2['jour'])
+    df_anim2 = df_anim2[(jours >= date) & (jours <= date)]
+    figures.append(px.scatter_mapbox(df_anim2, lat='lat', lon='lon', size='P', hover_name='dep', animation_frame='jour',
+                                     zoom=4, center=CENTER, height=800, mapbox_style='open-street-map'))
+    return _serialize(figures)
+
+
+SECTIONS = [
+    ('Indicateurs', old_indicateurs, new_indicateurs, render_indicateurs),
+    ('Tendances', old_tendances, new_tendances, render_tendances),
+    ('Prédictions', old_predictions, new_predictions, render_predictions),
+    ('Cartes', old_cartes, new_cartes, render_cartes),
+]
+
+
+def _best(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--sections', nargs='+', default=[name for name, *_ in SECTIONS],
+                        choices=[name for name, *_ in SECTIONS])
+    args = parser.parse_args()
+
+    try:
+        for scale in args.scales:
+            workdir = tempfile.mkdtemp(prefix='scale-%g-' % scale, dir=run._TMP)
+            server = run.serve_sources(scale, workdir)
+            try:
+                frames = data.load_frames()
+            finally:
+                server.shutdown()
+            d = data.build_dataset(frames)
+            dep = d.depts[AREA]
+            t = time.perf_counter()
+            cube = TestingCube(d.df_dep)
+            print('échelle %g : %d lignes, construction du cube %.3f s (une fois par chargement)'
+                  % (scale, len(d.df_dep), time.perf_counter() - t))
+            print('  %-12s %14s %14s %8s %14s %14s %8s'
+                  % ('section', 'agrégats av.', 'agrégats ap.', 'gain', 'rendu av.(ms)', 'rendu ap.(ms)', 'gain'))
+            for name, old, new, render in SECTIONS:
+                if name not in args.sections:
+                    continue
+                a_old = _best(lambda: old(d.df_dep, dep), args.repeat)
+                a_new = _best(lambda: new(cube, dep), args.repeat)
+                r_old = _best(lambda: render(d, old(d.df_dep, dep)), args.repeat)
+                r_new = _best(lambda: render(d, new(cube, dep)), args.repeat)
+                print('  %-12s %14.2f %14.3f %7.0fx %14.1f %14.1f %7.2fx'
+                      % (name, a_old * 1e3, a_new * 1e3, a_old / a_new, r_old * 1e3, r_new * 1e3, r_old / r_new))
+    finally:
+        shutil.rmtree(run._TMP, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
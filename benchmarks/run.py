@@ -0,0 +1,150 @@
+"""Suite de benchmarks hors-ligne : chargement des données et rendu des sections.
+
+    python -m benchmarks.run [--scales 1 10 100] [--sections indicateurs ...] [--compare REF]
+
+Pour chaque échelle, les fichiers synthétiques (``benchmarks/synthetic.py``)
+sont servis par un serveur HTTP local. Les étapes suivantes sont alors
+mesurées (``opencovid/profiling.py``) :
+
+* chargement à froid (téléchargement, parsing, préparation, snapshot) ;
+* chargement à chaud (snapshots) ;
+* publication et ouverture d'une version du service de données ;
+* rendu de chaque section, sans navigateur (streamlit en mode « bare »).
+
+Les résultats sont écrits dans ``benchmarks/results/<commit>.jsonl``.
+``--compare REF`` les compare à ceux d'un autre commit. L'échelle 100
+demande plusieurs Go de mémoire.
+"""
+import os
+import sys
+import tempfile
+
+# prévisions ajustées dans le répertoire temporaire, pas dans .forecasts
+_TMP = tempfile.mkdtemp(prefix='opencovid-bench-')
+os.environ['OPENCOVID_FORECAST_DIR'] = os.path.join(_TMP, 'forecasts')
+
+import argparse
+import functools
+import http.server
+import json
+import platform
+import shutil
+import subprocess
+import threading
+import time
+
+import pandas as pd
+
+from benchmarks import synthetic
+from opencovid import data, profiling, sections, service, snapshot
+from opencovid.sources import SOURCES
+
+AREA = 'Paris'
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def commit_id():
+    """Commit courant (suffixe -dirty si l'arbre est modifié)."""
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], universal_newlines=True).strip()
+        dirty = subprocess.call(['git', 'diff', '--quiet', 'HEAD'])
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + ('-dirty' if dirty else '')
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def _serve(directory):
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_sources(scale, workdir):
+    """Écrit les fichiers synthétiques de `scale` dans `workdir` et y pointe les sources ; renvoie le serveur."""
+    paths = synthetic.write_all(os.path.join(workdir, 'sources'), scale)
+    server = _serve(os.path.join(workdir, 'sources'))
+    for name, path in paths.items():
+        SOURCES[name]['url'] = 'http://127.0.0.1:%d/%s' % (server.server_port, os.path.basename(path))
+    snapshot.SNAPSHOT_DIR = os.path.join(workdir, 'snapshots')
+    return server
+
+
+def run_scale(scale, modules, workdir):
+    """Mesure toutes les étapes à l'échelle `scale` ; renvoie la liste des enregistrements."""
+    server = serve_sources(scale, workdir)
+    root = os.path.join(workdir, 'data')
+
+    results = []
+    try:
+        for phase in ('cold', 'warm', 'service', 'sections'):
+            snapshot.OFFLINE = phase == 'warm'
+            with profiling.profile() as records:
+                if phase in ('cold', 'warm'):
+                    with profiling.stage('load_frames'):
+                        frames = data.load_frames()
+                elif phase == 'service':
+                    service.publish(frames, root)
+                    dataset = service.DataService(root=root, ttl=float('inf')).get()
+                else:
+                    for module in modules:
+                        with profiling.stage('section.' + module):
+                            sections.load(module).render(dataset, AREA)
+            results += [dict(r, phase=phase, scale=scale) for r in records]
+    finally:
+        server.shutdown()
+    return results
+
+
+def summary(results):
+    """Durée totale (s) par (échelle, phase, étape)."""
+    df = pd.DataFrame(results)
+    return df.groupby(['scale', 'phase', 'stage'], sort=False)['seconds'].sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--sections', nargs='+', default=[m for _, m in sections.SECTIONS],
+                        choices=[m for _, m in sections.SECTIONS])
+    parser.add_argument('--output', default=RESULTS_DIR)
+    parser.add_argument('--compare', help='commit de référence (fichier de --output)')
+    args = parser.parse_args()
+
+    commit = commit_id()
+    meta = {'commit': commit, 'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+            'pandas': pd.__version__, 'machine': platform.machine(), 'cpus': os.cpu_count()}
+    results = []
+    try:
+        for scale in args.scales:
+            workdir = tempfile.mkdtemp(prefix='scale-%g-' % scale, dir=_TMP)
+            results += run_scale(scale, args.sections, workdir)
+    finally:
+        shutil.rmtree(_TMP, ignore_errors=True)
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, commit + '.jsonl')
+    with open(path, 'w') as f:
+        for r in results:
+            f.write(json.dumps(dict(meta, **r), default=str, ensure_ascii=False) + '\n')
+
+    current = summary(results)
+    if args.compare:
+        reference = summary(pd.read_json(os.path.join(args.output, args.compare + '.jsonl'), lines=True)
+                            .to_dict('records'))
+        table = pd.DataFrame({args.compare: reference, commit: current})
+        table['ratio'] = table[commit] / table[args.compare]
+    else:
+        table = current.to_frame(commit)
+    with pd.option_context('display.max_rows', None, 'display.width', 120, 'display.float_format', '{:.3f}'.format):
+        print(table)
+    print('résultats : %s' % path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Jeux de données synthétiques ayant la forme des fichiers amont.
+
+`scale` multiplie la profondeur d'historique (nombre de jours) ; les
+départements, classes d'âge et sources restent ceux des vrais fichiers.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from opencovid.geo import DEPARTMENTS
+
+CL_AGE90 = [0, 9, 19, 29, 39, 49, 59, 69, 79, 89, 90]
+SOURCE_TYPES = [
+    ('ministere-sante', 'Ministère des Solidarités et de la Santé'),
+    ('sante-publique-france-data', 'Santé publique France Data'),
+    ('opencovid19-fr', 'OpenCOVID19-fr'),
+]
+START = '2020-05-13'
+DAYS = 440
+
+
+def _days(scale):
+    return pd.date_range(START, periods=int(DAYS * scale), freq='D')
+
+
+def chiffres_cles(scale=1, seed=0):
+    rng = np.random.default_rng(seed)
+    days = _days(scale)
+    areas = pd.DataFrame([('pays', 'FRA', 'France')] + [('departement', 'DEP-' + code, nom) for code, nom in DEPARTMENTS.items()],
+                         columns=['granularite', 'maille_code', 'maille_nom'])
+    df = pd.DataFrame({'date': np.repeat(days.strftime('%Y-%m-%d'), len(areas))})
+    df = pd.concat([df, pd.concat([areas] * len(days), ignore_index=True)], axis=1)
+    # plusieurs sources par (date, zone), comme dans le vrai fichier
+    k = rng.integers(1, len(SOURCE_TYPES) + 1, len(df))
+    df = df.loc[df.index.repeat(k)].reset_index(drop=True)
+    rank = df.groupby(['date', 'maille_code']).cumcount()
+    sources = pd.DataFrame(SOURCE_TYPES, columns=['source_type', 'source_nom'])
+    df[['source_type', 'source_nom']] = sources.iloc[rank.to_numpy()].to_numpy()
+    n = len(df)
+    for col, lam in [('cas_confirmes', 5000), ('deces', 800), ('reanimation', 40), ('hospitalises', 250),
+                     ('nouvelles_hospitalisations', 15), ('nouvelles_reanimations', 3), ('gueris', 3000)]:
+        values = rng.poisson(lam, n).astype(float)
+        values[rng.random(n) < 0.1] = np.nan
+        df[col] = values
+    df['source_url'] = 'https://example.org/' + df['source_type']
+    return df[['date', 'granularite', 'maille_code', 'maille_nom', 'cas_confirmes', 'deces', 'reanimation',
+               'hospitalises', 'nouvelles_hospitalisations', 'nouvelles_reanimations', 'gueris',
+               'source_nom', 'source_url', 'source_type']]
+
+
+def sidep_quot_dep(scale=1, seed=0):
+    rng = np.random.default_rng(seed)
+    days = _days(scale).strftime('%Y-%m-%d')
+    idx = pd.MultiIndex.from_product([list(DEPARTMENTS), days, CL_AGE90], names=['dep', 'jour', 'cl_age90'])
+    df = idx.to_frame(index=False)
+    n = len(df)
+    df['T'] = rng.poisson(600, n)
+    df['P'] = rng.binomial(df['T'], 0.05)
+    df['pop'] = np.where(df['cl_age90'] == 0, 600000, 60000)
+    return df[['dep', 'jour', 'P', 'T', 'cl_age90', 'pop']]
+
+
+def _semaines(scale):
+    days = _days(scale)
+    return [(d - pd.Timedelta(days=6)).strftime('%Y-%m-%d') + '-' + d.strftime('%Y-%m-%d') for d in days[6:]]
+
+
+def sidep_tid_fra(scale=1, seed=0):
+    rng = np.random.default_rng(seed)
+    semaines = _semaines(scale)
+    df = pd.MultiIndex.from_product([semaines, CL_AGE90], names=['semaine_glissante', 'cl_age90']).to_frame(index=False)
+    df.insert(0, 'fra', 'FR')
+    df['P'] = rng.poisson(30000, len(df))
+    df['pop'] = np.where(df['cl_age90'] == 0, 67000000, 6700000)
+    return df
+
+
+def sidep_tid_dep(scale=1, seed=0):
+    rng = np.random.default_rng(seed)
+    semaines = _semaines(scale)
+    idx = pd.MultiIndex.from_product([list(DEPARTMENTS), semaines, CL_AGE90], names=['dep', 'semaine_glissante', 'cl_age90'])
+    df = idx.to_frame(index=False)
+    df['P'] = rng.poisson(300, len(df))
+    df['pop'] = np.where(df['cl_age90'] == 0, 600000, 60000)
+    return df
+
+
+def write_all(directory, scale=1):
+    """Écrit les quatre fichiers dans `directory` ; renvoie {source: chemin}."""
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name, build, sep in [('chiffres-cles', chiffres_cles, ','), ('sidep-quot-dep', sidep_quot_dep, ';'),
+                             ('sidep-tid-fra', sidep_tid_fra, ';'), ('sidep-tid-dep', sidep_tid_dep, ';')]:
+        paths[name] = os.path.join(directory, name + '.csv')
+        build(scale).to_csv(paths[name], sep=sep, index=False)
+    return paths
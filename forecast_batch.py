@@ -0,0 +1,69 @@
+"""Précalcul des prévisions à 30 jours : France et tous les départements.
+
+    python forecast_batch.py [--workers N] [--departments 75 13 ...] [--store DIR]
+
+Les modèles sont ajustés en parallèle (un processus par cœur) et écrits dans
+le répertoire lu par le tableau de bord (``OPENCOVID_FORECAST_DIR``).
+"""
+from opencovid import parallel
+
+parallel.limit_blas_threads()  # avant numpy
+
+import argparse
+import logging
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from opencovid import forecast
+from opencovid.data import load_data
+from opencovid.geo import DEPARTMENTS
+
+
+def _fit(name, y, spec):
+    warnings.simplefilter('ignore')  # avertissements de convergence : voir les diagnostics
+    t = time.perf_counter()
+    try:
+        return name, spec, forecast.fit_forecast(y, spec), None, time.perf_counter() - t
+    except Exception as e:  # une série en échec ne doit pas arrêter le lot
+        return name, spec, None, repr(e), time.perf_counter() - t
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--departments', nargs='+', default=list(DEPARTMENTS))
+    parser.add_argument('--store', default=forecast.STORE_DIR)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    cube = load_data().cube
+    # modèles retenus par backtest.py s'il a tourné
+    try:
+        best = forecast.read_best_models(args.store)
+    except OSError:
+        best = {}
+    series = [('France', forecast.national_series(cube), best.get('France', forecast.NATIONAL))]
+    series += [(dep, forecast.department_series(cube, dep), best.get(dep, forecast.DEPARTMENT))
+               for dep in args.departments if dep in cube.dep_codes]
+
+    t = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(_fit, name, y, spec) for name, y, spec in series]
+        for future in as_completed(futures):
+            name, spec, fc, error, seconds = future.result()
+            results.append((name, spec, fc, error))
+            status = error or 'aic=%.1f%s' % (fc.aic, '' if fc.converged else ' (non convergé)')
+            logging.info('%-6s %6.2f s  %s', name, seconds, status)
+    elapsed = time.perf_counter() - t
+
+    forecast.save_store(results, args.store)
+    failed = sum(error is not None for _, _, _, error in results)
+    logging.info('%d séries en %.1f s (%.2f séries/s, %d processus), %d échecs -> %s',
+                 len(results), elapsed, len(results) / elapsed, args.workers, failed, args.store)
+
+
+if __name__ == '__main__':
+    main()
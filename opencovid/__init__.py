@@ -0,0 +1 @@
+"""Couche de données du tableau de bord OPEN COVID (FR)."""
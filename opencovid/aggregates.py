@@ -0,0 +1,68 @@
+"""Agrégats SI-DEP (P, T) précalculés une fois par chargement des données."""
+import numpy as np
+import pandas as pd
+
+from opencovid.geo import GPS_DEP
+
+
+class TestingCube:
+    """Séries P/T de `df_dep` agrégées par jour, département et classe d'âge.
+
+    Toutes les séries sont triées par jour ; chaque accès est une simple
+    lecture de dictionnaire ou d'attribut.
+    """
+
+    def __init__(self, df_dep):
+        by_age = df_dep.groupby(['dep', 'jour', 'cl_age90'], sort=True, observed=True)[['P', 'T']].sum()
+        by_age = by_age.astype('int64')
+        by_dep = by_age.groupby(level=['dep', 'jour'], sort=True, observed=True).sum().reset_index()
+
+        # tous départements, avec coordonnées (cartes)
+        flat = by_dep.sort_values(['jour', 'dep'], ignore_index=True)
+        flat = flat.join(GPS_DEP, on='dep')
+        departments = flat.dropna(subset=['lat', 'lon'])[['jour', 'dep', 'lat', 'lon', 'P', 'T']]
+        self._index({'age': by_age.reset_index(), 'dep': by_dep, 'map': departments.reset_index(drop=True)})
+
+    @classmethod
+    def from_tables(cls, tables):
+        """Cube des tables de ``tables()`` ; détail par classe d'âge et cartes sont lus sans copie."""
+        cube = object.__new__(cls)
+        cube._index(tables)
+        return cube
+
+    def tables(self):
+        """{'age', 'dep', 'map'} : comptes par (dep, jour, cl_age90), par (dep, jour), et avec coordonnées."""
+        return self._tables
+
+    def _index(self, tables):
+        self._tables = tables
+        by_age, by_dep, self.departments = tables['age'], tables['dep'], tables['map']
+
+        # France : totaux quotidiens (index jour)
+        self.france = by_dep.groupby('jour', sort=True)[['P', 'T']].sum()
+        self.last_day = self.france.index[-1]
+        self._national = {m: self.france[[m]].reset_index() for m in ('P', 'T')}
+
+        # département : totaux quotidiens, et détail par classe d'âge (tranches de lignes de by_age, sans copie)
+        self._dep = {dep: frame.set_index('jour')[['P', 'T']]
+                     for dep, frame in by_dep.groupby('dep', sort=False, observed=True)}
+        codes = by_age['dep'].cat.codes.to_numpy()
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        self._dep_age = {}
+        for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(codes)]):
+            frame = by_age.iloc[start:stop]
+            frame.index = pd.RangeIndex(stop - start)
+            self._dep_age[by_age['dep'].iat[start]] = frame
+        self.dep_codes = list(self._dep)
+
+    def national(self, metric):
+        """DataFrame (jour, metric) des totaux France."""
+        return self._national[metric]
+
+    def department(self, dep):
+        """DataFrame indexé par jour des totaux P/T du département `dep`."""
+        return self._dep[dep]
+
+    def department_by_age(self, dep):
+        """DataFrame (dep, jour, cl_age90, P, T) du département `dep`."""
+        return self._dep_age[dep]
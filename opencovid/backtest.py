@@ -0,0 +1,83 @@
+"""Backtest à origine glissante des modèles de prévision.
+
+Pour chaque série et chaque modèle de la grille, le modèle est ajusté sur
+l'historique arrêté à plusieurs origines successives. Ses prévisions sont
+comparées aux cas observés ensuite (MAPE et RMSE à 7, 14 et 30 jours). Un
+modèle qui ne converge pas à une origine est abandonné sans évaluer les
+suivantes.
+"""
+import itertools
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from opencovid import forecast
+
+HORIZONS = (7, 14, 30)
+ORIGINS = 4  # nombre d'origines
+STEP = 14  # jours entre deux origines
+METRIC = 'mape_30'
+
+ORDERS = [(1,0,1), (1,0,2), (2,0,2), (4,0,2)]
+SEASONAL_ORDERS = [(1,0,1,7), (2,0,1,7), (4,0,2,7)]
+
+
+def grid(transforms=tuple(forecast.TRANSFORMS), orders=ORDERS, seasonal_orders=SEASONAL_ORDERS):
+    """Modèles à évaluer : produit des transformations et des ordres."""
+    return [{'transform': transform, 'order': order, 'seasonal_order': seasonal_order}
+            for transform, order, seasonal_order in itertools.product(transforms, orders, seasonal_orders)]
+
+
+def origins(p, n=ORIGINS, step=STEP, horizon=max(HORIZONS)):
+    """Dernières dates d'entraînement : la plus récente laisse `horizon` jours d'observations."""
+    last = p.index[-1] - pd.Timedelta(days=horizon)
+    return [last - pd.Timedelta(days=step * i) for i in reversed(range(n))]
+
+
+def _scores(actual, predicted):
+    scores = {}
+    for h in HORIZONS:
+        a, f = actual.iloc[:h], predicted.iloc[:h]
+        positive = a > 0
+        scores['mape_%d' % h] = float((np.abs(a - f)[positive] / a[positive]).mean() * 100)
+        scores['rmse_%d' % h] = float(np.sqrt(((a - f) ** 2).mean()))
+    return scores
+
+
+def evaluate(name, p, spec, n=ORIGINS, step=STEP, maxiter=200):
+    """Backtest du modèle `spec` sur la série `p` ; renvoie une ligne de résultats."""
+    warnings.simplefilter('ignore')  # la convergence est lue dans les résultats
+    t = time.perf_counter()
+    row = {'series': name, 'version': forecast.data_version(p)[0], 'n_obs': len(p),
+           'model': forecast.spec_key(spec), 'origins': n, 'step': step,
+           'evaluated': 0, 'converged': True, 'error': None}
+    daily = p.asfreq('D')
+    scores = []
+    try:
+        for origin in origins(p, n, step):
+            fc = forecast.fit_forecast(p[:origin], spec, maxiter=maxiter)
+            row['evaluated'] += 1
+            if not fc.converged:
+                row['converged'] = False
+                break  # arrêt anticipé
+            actual = daily[origin + pd.Timedelta(days=1):].iloc[:max(HORIZONS)]
+            scores.append(_scores(actual, fc.prediction.reindex(actual.index)))
+    except Exception as e:  # ordre invalide, matrice singulière...
+        row['converged'] = False
+        row['error'] = repr(e)
+    if row['converged'] and scores:
+        row.update(pd.DataFrame(scores).mean().to_dict())
+    row['seconds'] = time.perf_counter() - t
+    return row
+
+
+def best_models(results, metric=METRIC):
+    """Meilleur modèle convergé de chaque série selon `metric` (plus petit est meilleur)."""
+    if metric not in results:
+        results = results.assign(**{metric: np.nan})
+    ok = results[results['converged'] & results[metric].notna()]
+    best = ok.loc[ok.groupby('series')[metric].idxmin()]
+    columns = ['%s_%d' % (m, h) for h in HORIZONS for m in ('mape', 'rmse')]
+    return best.reindex(columns=['series', 'model', 'version'] + columns)
@@ -0,0 +1,93 @@
+"""Chargement et préparation des jeux de données."""
+import collections
+
+import pandas as pd
+
+from opencovid import profiling, schema, snapshot
+from opencovid.aggregates import TestingCube
+from opencovid.geo import GPS_DEP, add_coordinates, depts
+from opencovid.incidence import IncidenceEngine
+from opencovid.latest import build_latest_index
+
+Dataset = collections.namedtuple('Dataset', 'df df_dep df_tid df_tid_dep df_depts depts cube latest incidence')
+
+
+def _prepare_chiffres_cles(df0):
+    df0['date'] = df0['date'].str.replace('_','-')
+    df0['date'] = pd.to_datetime(df0['date'], errors='coerce')
+    # update gps coordinates
+    add_coordinates(df0, 'maille_nom')
+    return schema.apply(df0, 'chiffres-cles')
+
+
+def _prepare_sidep_quot_dep(df):
+    # update gps coordinates
+    add_coordinates(df, 'dep', GPS_DEP)
+    return schema.apply(df, 'sidep-quot-dep')
+
+
+def _prepare_sidep_tid_fra(df):
+    # taux d'incidence
+    df['tx_id'] = df['P']*100000/df['pop']
+    return schema.apply(df, 'sidep-tid-fra')
+
+
+def _prepare_sidep_tid_dep(df):
+    # update gps coordinates
+    add_coordinates(df, 'dep', GPS_DEP)
+    # taux d'incidence
+    df['tx_id'] = df['P']*100000/df['pop']
+    return schema.apply(df, 'sidep-tid-dep')
+
+
+def load_frames():
+    """Jeux de données préparés : {nom: DataFrame} (df, df_dep, df_tid, df_tid_dep, df_depts)."""
+    # chiffres clés (github opencovidfr) et SI-DEP (data.gouv.fr), en parallèle
+    frames = snapshot.load_all({
+        'chiffres-cles': _prepare_chiffres_cles,
+        'sidep-quot-dep': _prepare_sidep_quot_dep,
+        'sidep-tid-fra': _prepare_sidep_tid_fra,
+        'sidep-tid-dep': _prepare_sidep_tid_dep,
+    })
+    # les catégories des fichiers d'un snapshot peuvent différer après concaténation
+    with profiling.stage('load.schema'):
+        for name, df in frames.items():
+            schema.apply(df, name)
+    df0 = frames['chiffres-cles']
+
+    # df_depts0
+    with profiling.stage('load.df_depts'):
+        df_depts0 = df0[df0['granularite']=='departement']
+        df_depts0.loc[:,'nouvelles_hospitalisations'] = df_depts0.loc[:,'nouvelles_hospitalisations'].fillna(0)
+
+    return {'df': df0, 'df_dep': frames['sidep-quot-dep'], 'df_tid': frames['sidep-tid-fra'],
+            'df_tid_dep': frames['sidep-tid-dep'], 'df_depts': df_depts0}
+
+
+def build_dataset(frames, previous=None):
+    """Dataset des `frames` de ``load_frames`` : ajoute agrégats et dernières valeurs.
+
+    Les indicateurs glissants de `previous` (Dataset précédent) sont
+    complétés des seuls jours ajoutés.
+    """
+    schema.memory_report(frames)
+
+    # agrégats SI-DEP et dernières valeurs des indicateurs
+    with profiling.stage('dataset.cube'):
+        cube = TestingCube(frames['df_dep'])
+    with profiling.stage('dataset.latest'):
+        latest = build_latest_index(frames['df'], frames['df_dep'], frames['df_tid'], frames['df_tid_dep'])
+    with profiling.stage('dataset.incidence', incremental=previous is not None):
+        if previous is None:
+            incidence = IncidenceEngine(frames['df_dep'])
+        else:
+            incidence = previous.incidence.update(frames['df_dep'])
+    # taux d'incidence quotidien (7 jours glissants) plutôt que par semaine glissante publiée
+    latest.update(incidence.latest_index())
+
+    return Dataset(frames['df'], frames['df_dep'], frames['df_tid'], frames['df_tid_dep'], frames['df_depts'],
+                   depts, cube, latest, incidence)
+
+
+def load_data():
+    return build_dataset(load_frames())
@@ -0,0 +1,78 @@
+"""Réduction des séries temporelles avant leur envoi à plotly.
+
+Chaque trace est limitée à ``POINTS`` points (``OPENCOVID_MAX_POINTS``) :
+
+* courbes : Largest-Triangle-Three-Buckets (LTTB), qui garde la forme de la
+  série et ses pics ;
+* barres : les jours sont regroupés en tranches consécutives, et chaque
+  tranche est représentée par son jour de plus forte valeur (toutes classes
+  confondues pour les barres empilées).
+
+Une série plus courte que le budget est renvoyée telle quelle : restreindre
+la période affichée rend la pleine résolution.
+"""
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+POINTS = int(os.environ.get('OPENCOVID_MAX_POINTS', 300))
+
+
+def lttb(x, y, n):
+    """Positions des `n` points gardés par LTTB parmi (x, y), x croissant."""
+    size = len(x)
+    if n >= size or n < 3:
+        return np.arange(size)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # premier et dernier points gardés, n-2 tranches entre les deux
+    edges = np.linspace(1, size - 1, n - 1).astype(int)
+    keep = np.empty(n, dtype=int)
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nhi = edges[i + 2] if i + 2 < len(edges) else size
+        # sommet du triangle : moyenne de la tranche suivante
+        cx, cy = x[hi:nhi].mean(), y[hi:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def lines(df, x, y, color=None, n=POINTS):
+    """Lignes de `df` gardées par LTTB sur (x, y), trace par trace si `color`."""
+    if color is None:
+        groups = [df]
+    else:
+        groups = [g for _, g in df.groupby(color, observed=True, sort=False)]
+    kept = []
+    for g in groups:
+        g = g[g[y].notna()]
+        if len(g) > n:
+            xs = g[x].to_numpy()
+            if np.issubdtype(xs.dtype, np.datetime64):
+                xs = xs.astype('datetime64[ns]').astype(np.int64)
+            g = g.iloc[lttb(xs, g[y].to_numpy(dtype=float, na_value=np.nan), n)]
+        kept.append(g)
+    if not kept:
+        return df  # aucune trace : graphique vide, comme px.line
+    return pd.concat(kept) if len(kept) > 1 else kept[0]
+
+
+def bars(df, x, y, n=POINTS):
+    """Lignes de `df` des jours de pic de chaque tranche, au plus `n` jours.
+
+    Les barres empilées (plusieurs lignes par jour) sont gardées ou écartées
+    ensemble, selon le total du jour.
+    """
+    totals = df.groupby(x, observed=True)[y].sum().sort_index()
+    if len(totals) <= n:
+        return df
+    width = math.ceil(len(totals) / n)
+    bucket = np.arange(len(totals)) // width
+    peaks = totals.groupby(bucket).idxmax()
+    return df[df[x].isin(peaks.to_numpy())]
@@ -0,0 +1,82 @@
+"""Téléchargement des sources amont.
+
+Une session HTTP unique (connexions réutilisées, reprises avec backoff) est
+partagée par les threads de chargement. Les réponses sont lues en flux,
+décompressées à la volée si le serveur les envoie en gzip, et écrites dans
+un fichier temporaire : seuls un bloc et les derniers octets sont gardés en
+mémoire. Chaque téléchargement est mesuré dans ``STATS``.
+"""
+import collections
+import logging
+import tempfile
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+TIMEOUT = (10, 60)  # (connexion, lecture) en secondes
+RETRIES = 3
+BACKOFF = 1.0
+CHUNK_SIZE = 1 << 16
+
+logger = logging.getLogger(__name__)
+
+# body : fichier temporaire positionné au début, supprimé à sa fermeture
+Fetched = collections.namedtuple('Fetched', 'status_code headers body length tail')
+
+# dernier téléchargement de chaque source : secondes, octets reçus / décompressés
+STATS = {}
+
+_session = None
+_lock = threading.Lock()
+
+
+def session():
+    global _session
+    with _lock:
+        if _session is None:
+            retry = Retry(total=RETRIES, backoff_factor=BACKOFF,
+                          status_forcelist=(429, 500, 502, 503, 504),
+                          allowed_methods=('HEAD', 'GET'))
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8, max_retries=retry)
+            _session = requests.Session()
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+def head(url, timeout=TIMEOUT):
+    r = session().head(url, allow_redirects=True, timeout=timeout)
+    r.raise_for_status()
+    return r.headers
+
+
+def get(url, name=None, headers=None, timeout=TIMEOUT, tail=0):
+    """Télécharge `url` en flux ; renvoie un `Fetched`.
+
+    Le corps est écrit dans un fichier temporaire (`body`, à fermer par
+    l'appelant) ; `length` est sa taille et `tail` ses `tail` derniers octets.
+    """
+    t = time.perf_counter()
+    body = tempfile.TemporaryFile()
+    try:
+        with session().get(url, headers=headers, timeout=timeout, stream=True) as r:
+            r.raise_for_status()
+            length, last = 0, b''
+            for chunk in r.iter_content(CHUNK_SIZE):
+                body.write(chunk)
+                length += len(chunk)
+                last = (last + chunk)[-tail:] if tail else b''
+            wire = r.raw.tell()
+        body.seek(0)
+    except BaseException:
+        body.close()
+        raise
+    elapsed = time.perf_counter() - t
+    if name is not None:
+        STATS[name] = {'seconds': round(elapsed, 3), 'bytes': wire, 'decoded_bytes': length,
+                       'status': r.status_code}
+        logger.info('%s : %d octets (%d décompressés) en %.2f s', name, wire, length, elapsed)
+    return Fetched(r.status_code, r.headers, body, length, last)
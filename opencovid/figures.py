@@ -0,0 +1,119 @@
+"""Cache des figures plotly sérialisées, partagé entre les sessions.
+
+Une figure est construite une fois par clé (graphique, période, version des
+données...) puis gardée sous forme JSON ; l'éviction est LRU, bornée en
+nombre de figures et en taille totale (``OPENCOVID_FIGURE_CACHE_MB``). La
+taille et la durée de construction de chaque figure sont journalisées.
+
+``animation_frames`` réduit le nombre d'images des animations : au-delà de
+``MAX_FRAMES`` jours, les jours sont regroupés par semaine, puis une semaine
+sur k est gardée si nécessaire.
+"""
+import collections
+import json
+import logging
+import math
+import os
+import threading
+
+import pandas as pd
+
+from opencovid import profiling
+from opencovid.sources import REINGEST_DAYS
+
+logger = logging.getLogger(__name__)
+
+MAX_BYTES = int(float(os.environ.get('OPENCOVID_FIGURE_CACHE_MB', 64)) * 2**20)
+MAX_ITEMS = 128
+MAX_FRAMES = int(os.environ.get('OPENCOVID_MAX_FRAMES', 60))
+
+FigureStats = collections.namedtuple('FigureStats', 'key bytes build_seconds hit')
+
+
+def data_version(df, date_col):
+    """Version d'un DataFrame daté : dernier jour, nombre de lignes et empreinte des jours relus.
+
+    Les lignes des ``REINGEST_DAYS`` derniers jours peuvent être remplacées
+    sans que le nombre de lignes change.
+    """
+    last = df[date_col].max()
+    recent = df[df[date_col] > last - pd.Timedelta(days=REINGEST_DAYS)]
+    return (str(last)[:10], len(df), int(pd.util.hash_pandas_object(recent, index=False).sum()))
+
+
+class FigureCache:
+    """Cache LRU de figures sérialisées en JSON, borné en nombre et en octets."""
+
+    def __init__(self, max_bytes=MAX_BYTES, max_items=MAX_ITEMS):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.bytes = 0
+        self.stats = collections.deque(maxlen=100)  # dernières FigureStats
+        self._figures = collections.OrderedDict()  # clé -> JSON
+        self._lock = threading.Lock()
+
+    def _store(self, key, payload):
+        # appelé sous self._lock
+        if key in self._figures:
+            self.bytes -= len(self._figures.pop(key))
+        if len(payload) > self.max_bytes:
+            return  # trop grosse pour être gardée
+        self._figures[key] = payload
+        self.bytes += len(payload)
+        while len(self._figures) > self.max_items or self.bytes > self.max_bytes:
+            _, old = self._figures.popitem(last=False)
+            self.bytes -= len(old)
+
+    def get(self, key, build):
+        """Figure (dict plotly) de la clé `key`, construite par `build()` si absente du cache."""
+        with self._lock:
+            payload = self._figures.get(key)
+            if payload is not None:
+                self._figures.move_to_end(key)
+                self.stats.append(FigureStats(key, len(payload), 0., True))
+                return json.loads(payload)
+        # construction hors verrou : les autres figures restent servies
+        with profiling.stage('figure', key=str(key)) as record:
+            payload = build().to_json()
+            record['bytes'] = len(payload)
+        seconds = record['seconds']
+        logger.info('figure %s : %.1f Ko construite en %.2f s', key, len(payload) / 1024, seconds)
+        with self._lock:
+            self._store(key, payload)
+            self.stats.append(FigureStats(key, len(payload), seconds, False))
+        return json.loads(payload)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def cache():
+    """FigureCache du processus (singleton), partagé entre les sessions."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = FigureCache()
+        return _cache
+
+
+def animation_frames(df, date_col, keys, values, max_frames=MAX_FRAMES):
+    """Réduit `df` (une ligne par jour et par lieu) à au plus `max_frames` images.
+
+    Au-delà de `max_frames` jours, les `values` sont sommées par semaine et par
+    lieu (`keys`, les autres colonnes prennent la première valeur) ; s'il
+    reste trop de semaines, une sur k est gardée. La colonne `date_col`
+    contient alors le premier jour de chaque semaine.
+    """
+    days = df[date_col].nunique()
+    if days <= max_frames:
+        return df
+    week = df[date_col].dt.to_period('W').dt.start_time.rename(date_col)
+    others = [c for c in df.columns if c not in keys and c not in values and c != date_col]
+    agg = dict({c: 'sum' for c in values}, **{c: 'first' for c in others})
+    df = df.groupby([week] + [df[k] for k in keys], observed=True, sort=True).agg(agg).reset_index()
+    weeks = df[date_col].drop_duplicates()
+    if len(weeks) > max_frames:
+        step = math.ceil(len(weeks) / max_frames)
+        df = df[df[date_col].isin(weeks.iloc[::-step])]  # la dernière semaine est toujours gardée
+    return df
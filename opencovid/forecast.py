@@ -0,0 +1,253 @@
+"""Prévisions SARIMAX des cas positifs à 30 jours.
+
+Les modèles sont ajustés en arrière-plan par un ``ForecastEngine`` partagé
+entre les sessions. Ses résultats sont mis en cache par (série, version des
+données, modèle) avec éviction LRU. Tant qu'un ajustement est en cours, la
+dernière prévision de la série reste disponible. Quand un jour de données
+s'ajoute, l'ajustement repart des paramètres précédents.
+
+Le moteur lit aussi les prévisions précalculées par ``forecast_batch.py``
+(répertoire ``OPENCOVID_FORECAST_DIR``) : une série déjà ajustée sur les
+données courantes est servie sans ajustement. Si ``backtest.py`` y a
+enregistré un meilleur modèle pour une série, il remplace le modèle par
+défaut.
+
+Un modèle est un dict : ``transform`` (clé de ``TRANSFORMS``) plus les
+arguments de ``SARIMAX``.
+"""
+import collections
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from opencovid import profiling
+
+HORIZON = 30
+CACHE_SIZE = 256
+STORE_DIR = os.environ.get('OPENCOVID_FORECAST_DIR', '.forecasts')
+DIAGNOSTIC_COLUMNS = ['series', 'model', 'error', 'last_observation', 'n_obs', 'aic', 'converged', 'fit_seconds',
+                      'params']
+
+# transformation de la série P avant ajustement, et son inverse
+TRANSFORMS = {
+    'log': (lambda p: np.log(p.where(p > 0)), np.exp),
+    'log1p': (np.log1p, np.expm1),
+    # historique département : log(P*100), zéros remplacés par 1
+    'log100': (lambda p: np.log((p*100).replace(0,1)), lambda y: np.exp(y)/100),
+}
+
+# modèles historiques du tableau de bord
+NATIONAL = {'transform': 'log', 'order': (4,0,2), 'seasonal_order': (4,0,2,7),
+            'enforce_stationarity': False, 'enforce_invertibility': False, 'trend': 'n'}
+DEPARTMENT = {'transform': 'log100', 'order': (1,0,2), 'seasonal_order': (1,0,1,7)}
+
+Forecast = collections.namedtuple('Forecast', 'prediction params aic converged fit_seconds last_observation n_obs')
+
+
+def national_series(cube):
+    """Cas positifs quotidiens France, indexés par jour."""
+    return cube.national('P').set_index('jour')['P']
+
+
+def department_series(cube, dep):
+    """Cas positifs quotidiens du département `dep`, indexés par jour."""
+    return cube.department(dep)['P']
+
+
+def data_version(y):
+    """Version d'une série : dernier jour observé et nombre d'observations."""
+    return (str(y.index[-1])[:10], len(y))
+
+
+def spec_key(spec):
+    """Identifiant texte d'une spécification de modèle."""
+    return json.dumps(spec, sort_keys=True)
+
+
+def fit_forecast(p, spec, start_params=None, horizon=HORIZON, maxiter=50):
+    """Ajuste le modèle `spec` sur la série `p` ; prévision à `horizon` jours après la dernière observation."""
+    import statsmodels.api as sm
+
+    t = time.perf_counter()
+    n_obs = len(p)
+    spec = dict(spec)
+    forward, inverse = TRANSFORMS[spec.pop('transform')]
+    y = forward(p.astype(float)).asfreq('D')
+    model = sm.tsa.SARIMAX(y, **spec)
+    if start_params is not None and len(start_params) != len(model.param_names):
+        start_params = None
+    res = model.fit(start_params=start_params, disp=False, maxiter=maxiter)
+    prediction = inverse(res.get_forecast(horizon).predicted_mean) # retour à l'échelle de P
+    return Forecast(prediction=prediction, params=np.asarray(res.params), aic=res.aic,
+                    converged=bool(res.mle_retvals.get('converged', True)),
+                    fit_seconds=time.perf_counter() - t, last_observation=y.index[-1], n_obs=n_obs)
+
+
+def write_parquet(df, path):
+    """Écrit `df` dans `path` de façon atomique (fichier temporaire puis ``os.replace``)."""
+    df.to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+
+
+def save_store(results, store_dir=STORE_DIR):
+    """Enregistre les prévisions d'un lot.
+
+    `results` est une liste de (nom, spec, Forecast ou None, erreur) ;
+    prévisions et diagnostics sont écrits dans deux fichiers Parquet.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    predictions, diagnostics = [], []
+    for name, spec, fc, error in results:
+        row = {'series': name, 'model': spec_key(spec), 'error': error}
+        if fc is not None:
+            row.update(last_observation=fc.last_observation, n_obs=fc.n_obs, aic=fc.aic,
+                       converged=fc.converged, fit_seconds=fc.fit_seconds, params=list(fc.params))
+            predictions.append(pd.DataFrame({'series': name, 'model': row['model'],
+                                             'jour': fc.prediction.index, 'prediction': fc.prediction.values}))
+        diagnostics.append(row)
+    # tous les ajustements peuvent échouer : fichiers vides mais au bon schéma
+    predictions = pd.concat(predictions, ignore_index=True) if predictions else pd.DataFrame(
+        {'series': pd.Series(dtype=object), 'model': pd.Series(dtype=object),
+         'jour': pd.Series(dtype='datetime64[ns]'), 'prediction': pd.Series(dtype=float)})
+    diagnostics = pd.DataFrame(diagnostics).reindex(columns=DIAGNOSTIC_COLUMNS)
+    # prévisions d'abord : le moteur recharge le lot quand les diagnostics changent
+    write_parquet(predictions, os.path.join(store_dir, 'predictions.parquet'))
+    write_parquet(diagnostics, os.path.join(store_dir, 'diagnostics.parquet'))
+
+
+def read_best_models(store_dir=STORE_DIR):
+    """Meilleur modèle de chaque série selon le dernier backtest : {série: spec}."""
+    best = pd.read_parquet(os.path.join(store_dir, 'best_models.parquet'))
+    return {row.series: json.loads(row.model) for row in best.itertuples(index=False)}
+
+
+def read_store(store_dir=STORE_DIR):
+    """Prévisions d'un lot enregistré : {(série, version, modèle): Forecast}."""
+    diagnostics = pd.read_parquet(os.path.join(store_dir, 'diagnostics.parquet'))
+    predictions = pd.read_parquet(os.path.join(store_dir, 'predictions.parquet'))
+    predictions = {key: frame.set_index('jour')['prediction']
+                   for key, frame in predictions.groupby(['series', 'model'], sort=False)}
+    store = {}
+    for row in diagnostics.dropna(subset=['n_obs']).itertuples(index=False):
+        fc = Forecast(prediction=predictions[(row.series, row.model)], params=np.asarray(row.params),
+                      aic=row.aic, converged=row.converged, fit_seconds=row.fit_seconds,
+                      last_observation=row.last_observation, n_obs=int(row.n_obs))
+        store[(row.series, (str(fc.last_observation)[:10], fc.n_obs), row.model)] = fc
+    return store
+
+
+class ForecastEngine:
+    """Cache LRU de prévisions, ajustées par un thread d'arrière-plan."""
+
+    def __init__(self, max_size=CACHE_SIZE, workers=1, store_dir=STORE_DIR):
+        self.max_size = max_size
+        self.store_dir = store_dir
+        self._store_mtime = None
+        self._best_mtime = None
+        self._best = {}
+        self._cache = collections.OrderedDict()  # (série, version, modèle) -> Forecast
+        self._latest = {}  # (série, modèle) -> dernière Forecast, pour l'affichage et le warm start
+        self._pending = {}  # (série, version, modèle) -> Future
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='forecast')
+        self._lock = threading.Lock()
+
+    def _key(self, name, y, spec):
+        return (name, data_version(y), spec_key(spec))
+
+    def _remember(self, key, fc):
+        # appelé sous self._lock
+        self._cache[key] = fc
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        latest = self._latest.get((key[0], key[2]))
+        if latest is None or latest.last_observation <= fc.last_observation:
+            self._latest[(key[0], key[2])] = fc
+
+    def _sync_store(self):
+        # appelé sous self._lock : recharge le lot précalculé et les meilleurs modèles s'ils ont changé
+        try:
+            mtime = os.path.getmtime(os.path.join(self.store_dir, 'diagnostics.parquet'))
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime != self._store_mtime:
+            self._store_mtime = mtime
+            for key, fc in read_store(self.store_dir).items():
+                self._remember(key, fc)
+        try:
+            mtime = os.path.getmtime(os.path.join(self.store_dir, 'best_models.parquet'))
+        except OSError:
+            return
+        if mtime != self._best_mtime:
+            self._best_mtime = mtime
+            self._best = read_best_models(self.store_dir)
+
+    def model_for(self, name, default):
+        """Modèle retenu par le backtest pour la série `name`, sinon `default`."""
+        with self._lock:
+            self._sync_store()
+            return self._best.get(name, default)
+
+    def _fit(self, key, y, spec, start_params):
+        try:
+            with profiling.stage('forecast.fit', series=key[0], warm_start=start_params is not None):
+                fc = fit_forecast(y, spec, start_params)
+            with self._lock:
+                self._remember(key, fc)
+            return fc
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _submit(self, key, y, spec):
+        # appelé sous self._lock
+        future = self._pending.get(key)
+        if future is None:
+            latest = self._latest.get((key[0], key[2]))
+            start_params = latest.params if latest is not None else None
+            future = self._pool.submit(self._fit, key, y, spec, start_params)
+            self._pending[key] = future
+        return future
+
+    def get(self, name, y, spec):
+        """Renvoie (prévision, à_jour) pour la série `name`.
+
+        Si la prévision de cette version des données n'est pas encore prête,
+        son ajustement est lancé en arrière-plan et la dernière prévision
+        connue de la série est renvoyée (None s'il n'y en a aucune).
+        """
+        key = self._key(name, y, spec)
+        with self._lock:
+            self._sync_store()
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key], True
+            self._submit(key, y, spec)
+            return self._latest.get((name, key[2])), False
+
+    def wait(self, name, y, spec, timeout=None):
+        """Attend la prévision de la version courante de `y`."""
+        key = self._key(name, y, spec)
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+            future = self._submit(key, y, spec)
+        return future.result(timeout)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def engine():
+    """ForecastEngine du processus (singleton), partagé entre les sessions."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = ForecastEngine()
+        return _engine
@@ -0,0 +1,196 @@
+"""Indicateurs glissants sur 7 jours, calculés pour tous les départements à la fois.
+
+À partir des données quotidiennes SI-DEP (``df_dep``), pour chaque
+département, la France entière et chaque classe d'âge :
+
+* ``tx_id`` : taux d'incidence, cas positifs des 7 derniers jours pour 100 000 habitants ;
+* ``tx_pos`` : taux de positivité (%), positifs / testés sur 7 jours ;
+* ``croissance`` : évolution (%) des positifs sur 7 jours par rapport à la semaine précédente.
+
+Les comptes sont rangés dans des tableaux (zone, jour, classe d'âge), et les
+sommes glissantes sont calculées en une passe par sommes cumulées.
+``update`` ne recalcule que les jours ajoutés depuis le précédent calcul et
+les ``REINGEST_DAYS`` derniers jours, dont les lignes ont pu être remplacées.
+"""
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from opencovid.geo import DEPARTMENTS, GPS_DEP
+from opencovid.latest import Latest
+from opencovid.sources import REINGEST_DAYS
+
+WINDOW = 7
+METRICS = ('tx_id', 'tx_pos', 'croissance')
+FRANCE = 'France'
+
+
+def _positions(values, labels):
+    # position de chaque valeur dans `labels` (-1 si absente), via les catégories si possible
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return pd.Index(labels).get_indexer(values.cat.categories)[values.cat.codes]
+    return pd.Index(labels).get_indexer(values)
+
+
+def _grid(df, deps, start, n_days, ages):
+    # comptes P, T (zone, jour, âge), France en dernière ligne ; population par (zone, âge)
+    d = _positions(df['dep'], deps)
+    a = _positions(df['cl_age90'], ages)
+    ok = (d >= 0) & (a >= 0) & df['jour'].notna().to_numpy()
+    t = ((df['jour'].to_numpy()[ok] - np.datetime64(start)) // np.timedelta64(1, 'D')).astype(np.int64)
+    flat = (d[ok] * n_days + t) * len(ages) + a[ok]
+    shape = (len(deps), n_days, len(ages))
+    counts = [np.bincount(flat, weights=df[m].to_numpy(dtype=float, na_value=0)[ok], minlength=np.prod(shape))
+              .reshape(shape) for m in ('P', 'T')]
+    counts = [np.concatenate([c, c.sum(axis=0, keepdims=True)]).astype(np.int32) for c in counts]
+    pop = np.full((len(deps), len(ages)), np.nan)
+    last = df.dropna(subset=['pop']).drop_duplicates(['dep', 'cl_age90'], keep='last')
+    pop[_positions(last['dep'], deps), _positions(last['cl_age90'], ages)] = last['pop'].to_numpy(dtype=float)
+    return counts[0], counts[1], pop
+
+
+def _day_rows(df, start, n_days):
+    # nombre de lignes datées de chaque jour à partir de `start`
+    t = (df['jour'].dropna().to_numpy() - np.datetime64(start)) // np.timedelta64(1, 'D')
+    return np.bincount(t.astype(np.int64), minlength=n_days)
+
+
+def _rolling(counts, head):
+    # sommes sur WINDOW jours des jours `head`: ; counts contient les WINDOW-1 jours précédents s'ils existent
+    c = np.cumsum(counts, axis=1, dtype=np.int64)
+    c = np.concatenate([np.zeros_like(c[:, :1]), c], axis=1)
+    n = counts.shape[1]
+    out = np.full(counts.shape, np.nan, dtype=np.float32)
+    t = np.arange(WINDOW - 1, n)
+    out[:, t] = c[:, t + 1] - c[:, t + 1 - WINDOW]
+    return out[:, head:]
+
+
+class IncidenceEngine:
+    """Sommes glissantes P/T sur 7 jours par (zone, jour, classe d'âge)."""
+
+    def __init__(self, df_dep):
+        self.deps = sorted(df_dep['dep'].dropna().unique().astype(str))
+        self.ages = sorted(int(a) for a in df_dep['cl_age90'].dropna().unique())
+        self.days = pd.date_range(df_dep['jour'].min(), df_dep['jour'].max(), freq='D')
+        self.rows = len(df_dep)
+        self._p, self._t, pop = _grid(df_dep, self.deps, self.days[0], len(self.days), self.ages)
+        self._day_rows = _day_rows(df_dep, self.days[0], len(self.days))
+        self._pop = np.concatenate([pop, np.nansum(pop, axis=0, keepdims=True)])
+        self._p7, self._t7 = _rolling(self._p, 0), _rolling(self._t, 0)
+        self.areas = self.deps + [FRANCE]
+
+    def to_arrays(self):
+        """(meta, tableaux) du moteur, pour ``from_arrays`` ; meta est sérialisable en JSON."""
+        meta = {'deps': self.deps, 'ages': self.ages, 'start': str(self.days[0])[:10], 'n_days': len(self.days),
+                'rows': self.rows}
+        arrays = {'p': self._p, 't': self._t, 'p7': self._p7, 't7': self._t7, 'pop': self._pop,
+                  'day_rows': self._day_rows}
+        return meta, arrays
+
+    @classmethod
+    def from_arrays(cls, meta, arrays):
+        """Moteur de ``to_arrays`` ; les tableaux (mappés en mémoire par exemple) ne sont pas copiés."""
+        engine = object.__new__(cls)
+        engine.deps, engine.ages, engine.rows = meta['deps'], meta['ages'], meta['rows']
+        engine.days = pd.date_range(meta['start'], periods=meta['n_days'], freq='D')
+        engine.areas = engine.deps + [FRANCE]
+        engine._p, engine._t, engine._p7, engine._t7 = (arrays[k] for k in ('p', 't', 'p7', 't7'))
+        engine._pop, engine._day_rows = arrays['pop'], arrays['day_rows']
+        return engine
+
+    @property
+    def last_day(self):
+        return self.days[-1]
+
+    @property
+    def version(self):
+        """Clé des indicateurs du dernier jour : jour, lignes et empreinte des dernières sommes."""
+        recent = slice(-(WINDOW + 1), None)  # croissance : comparaison à la semaine précédente
+        digest = zlib.crc32(self._p7[:, recent].tobytes() + self._t7[:, recent].tobytes() + self._pop.tobytes())
+        return (str(self.last_day)[:10], self.rows, digest)
+
+    def update(self, df_dep):
+        """Moteur pour `df_dep`, recalculé à partir des ``REINGEST_DAYS`` derniers jours.
+
+        Renvoie un nouveau moteur (celui-ci reste valide pour ses lecteurs).
+        Si des lignes antérieures ont changé ou si de nouveaux départements
+        ou classes d'âge apparaissent, tout est recalculé.
+        """
+        keep = max(len(self.days) - REINGEST_DAYS, 0)  # jours repris tels quels
+        start = self.days[0] + pd.Timedelta(days=keep)
+        new = df_dep[df_dep['jour'] >= start]
+        if (df_dep['jour'] < start).sum() != self._day_rows[:keep].sum() or not len(new):
+            return IncidenceEngine(df_dep)
+        deps = set(new['dep'].dropna().unique().astype(str))
+        ages = set(new['cl_age90'].dropna().unique().astype(int))
+        if not deps <= set(self.deps) or not ages <= set(self.ages):
+            return IncidenceEngine(df_dep)
+
+        engine = object.__new__(IncidenceEngine)
+        engine.deps, engine.ages, engine.areas = self.deps, self.ages, self.areas
+        engine.days = pd.date_range(self.days[0], max(new['jour'].max(), start), freq='D')
+        engine.rows = len(df_dep)
+        n_new = len(engine.days) - keep
+        p, t, pop = _grid(new, self.deps, start, n_new, self.ages)
+        engine._day_rows = np.concatenate([self._day_rows[:keep], _day_rows(new, start, n_new)])
+        engine._pop = self._pop.copy()
+        known = ~np.isnan(pop)
+        engine._pop[:-1][known] = pop[known]
+        engine._pop[-1] = np.nansum(engine._pop[:-1], axis=0)
+        engine._p = np.concatenate([self._p[:, :keep], p], axis=1)
+        engine._t = np.concatenate([self._t[:, :keep], t], axis=1)
+        # seules les sommes des jours recalculés sont refaites, avec les WINDOW-1 jours qui précèdent
+        tail = min(WINDOW - 1, keep)
+        engine._p7 = np.concatenate([self._p7[:, :keep], _rolling(engine._p[:, keep - tail:], tail)], axis=1)
+        engine._t7 = np.concatenate([self._t7[:, :keep], _rolling(engine._t[:, keep - tail:], tail)], axis=1)
+        return engine
+
+    def _values(self, metric, age, days=slice(None)):
+        # tableau (zone, jour) de l'indicateur pour la classe d'âge `age`
+        a = self.ages.index(age)
+        p7 = self._p7[:, days, a].astype(float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if metric == 'tx_id':
+                return p7 * 100000 / self._pop[:, a, None]
+            if metric == 'tx_pos':
+                t7 = self._t7[:, days, a]
+                return np.where(t7 > 0, p7 * 100 / t7, np.nan)
+            if metric == 'croissance':
+                p7_all = self._p7[:, :, a].astype(float)
+                previous = np.full_like(p7_all, np.nan)
+                previous[:, WINDOW:] = p7_all[:, :-WINDOW]
+                return np.where(previous[:, days] > 0, (p7 / previous[:, days] - 1) * 100, np.nan)
+        raise KeyError(metric)
+
+    def series(self, area, age=0):
+        """DataFrame indexé par jour des indicateurs de la zone `area` (code département ou 'France')."""
+        i = self.areas.index(area)
+        return pd.DataFrame({m: self._values(m, age)[i] for m in METRICS}, index=self.days.rename('jour'))
+
+    def matrix(self, metric, age=0, days=60):
+        """DataFrame (département × `days` derniers jours) de l'indicateur `metric`."""
+        values = self._values(metric, age, slice(-days, None))[:-1]
+        return pd.DataFrame(values, index=pd.Index(self.deps, name='dep'), columns=self.days[-days:])
+
+    def ranking(self, age=0, day=-1):
+        """Départements au jour `day` (position), triés par taux d'incidence décroissant, avec coordonnées."""
+        df = pd.DataFrame({m: self._values(m, age, slice(day, None if day == -1 else day + 1))[:-1, 0]
+                           for m in METRICS}, index=pd.Index(self.deps, name='dep'))
+        df.insert(0, 'departement', df.index.map(DEPARTMENTS))
+        df = df.join(GPS_DEP)
+        return df.sort_values('tx_id', ascending=False).reset_index()
+
+    def latest_index(self, age=0):
+        """{(zone, indicateur): Latest} au dernier jour ; zone = 'France' ou nom de département."""
+        date = str(self.last_day)[:10]
+        index = {}
+        for metric in METRICS:
+            values = self._values(metric, age, slice(-2, None))
+            for area, (previous, value) in zip(self.areas, values):
+                if np.isnan(value):
+                    continue
+                name = area if area == FRANCE else DEPARTMENTS.get(area, area)
+                index[(name, metric)] = Latest(date, float(value), None if np.isnan(previous) else float(previous))
+        return index
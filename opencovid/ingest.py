@@ -0,0 +1,223 @@
+"""Ingestion incrémentale des sources amont.
+
+Les fichiers amont ne font que grandir d'un jour à l'autre. Pour chaque
+source on conserve un état : le plus grand jour déjà ingéré (``mark``), la
+taille du fichier, ses derniers octets et la position (``window``) de la
+première ligne des ``REINGEST_DAYS`` derniers jours.
+
+Des lignes d'un jour déjà ingéré arrivent parfois plus tard (chiffres clés
+des ARS et préfectures après ceux du ministère). Une mise à jour renvoie donc
+toutes les lignes des jours à partir de ``since(mark)`` ; elles remplacent
+celles du snapshot. Elle demande le fichier à partir de ``window`` par
+requête HTTP Range ; si le serveur l'accepte et que les octets déjà connus
+n'ont pas bougé, seules ces lignes sont lues. Sinon le fichier est relu en
+entier.
+"""
+import base64
+import datetime
+import io
+
+import numpy as np
+import pandas as pd
+import requests
+
+from opencovid import fetch, profiling
+from opencovid.sources import CHUNK_ROWS, REINGEST_DAYS, SOURCES, merge_sources, reduce_sources
+
+TAIL_BYTES = 1024
+
+
+def _download(name, headers=None):
+    source = SOURCES[name]
+    with profiling.stage('load.%s.download' % name) as record:
+        r = fetch.get(source['url'], name=name, headers=headers, timeout=source.get('timeout', fetch.TIMEOUT),
+                      tail=TAIL_BYTES)
+        record['bytes'] = r.length
+    return r
+
+
+class _Prefixed(io.RawIOBase):
+    # `prefix` puis la suite de `stream` : l'en-tête CSV devant les seules lignes relues
+    def __init__(self, prefix, stream):
+        self._prefix = prefix
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self._prefix:
+            n = min(len(b), len(self._prefix))
+            b[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        return self._stream.readinto(b)
+
+
+def _parse(stream, name, size):
+    # renvoie (DataFrame, première ligne lue de chaque jour : Series mark -> rang)
+    source = SOURCES[name]
+    with profiling.stage('load.%s.parse' % name, bytes=size) as record:
+        if 'dedupe' in source:
+            df, firsts = _parse_chunks(stream, source)
+        else:
+            df = pd.read_csv(stream, sep=source['sep'], dtype=source.get('dtype'), low_memory=False)
+            firsts = _first_rows(df, source['mark'])
+        record['rows'] = len(df)
+    return df, firsts
+
+
+def _first_rows(chunk, mark):
+    first = chunk[mark].drop_duplicates()
+    return pd.Series(first.index, index=mark_values(first).to_numpy()).groupby(level=0).min()
+
+
+def _parse_chunks(buffer, source):
+    # mémoire bornée par un bloc et par une ligne par clé : les doublons ne sont jamais tous chargés
+    usecols = source.get('usecols')
+    mark = source['mark']
+    reduced, firsts = None, []
+    for chunk in pd.read_csv(buffer, sep=source['sep'], dtype=source.get('dtype'), chunksize=CHUNK_ROWS,
+                             usecols=(lambda c: c in usecols) if usecols else None):
+        firsts.append(_first_rows(chunk, mark))
+        for col, values in source.get('keep', {}).items():
+            chunk = chunk[chunk[col].isin(values)]
+        chunk = chunk.assign(**{mark: mark_values(chunk[mark])})
+        part = reduce_sources(chunk, source['dedupe'])
+        reduced = part if reduced is None else merge_sources(reduced, part)
+    firsts = pd.concat(firsts).groupby(level=0).min() if firsts else pd.Series(dtype=np.int64)
+    if reduced is None:
+        return pd.DataFrame(columns=usecols), firsts
+    # colonnes dans l'ordre du fichier
+    df = reduced[0].reset_index()
+    return df[[c for c in usecols if c in df] if usecols else list(df.columns)], firsts
+
+
+def mark_values(values):
+    """Valeurs comparables de la colonne de date (chaînes ISO, '_' normalisés)."""
+    return values.astype(str).str.replace('_', '-')
+
+
+def _last_mark(values):
+    # plus grand jour renseigné ('' si aucun) : 'nan' ou 'NaT' ne comptent pas
+    values = mark_values(values)
+    values = values[values.str[:1].str.isdigit()]
+    return values.max() if len(values) else ''
+
+
+def since(mark):
+    """Premier jour (ISO) relu par la mise à jour suivante : ``REINGEST_DAYS`` jours jusqu'à `mark` inclus."""
+    if not mark:
+        return ''
+    day = datetime.date.fromisoformat(mark[:10]) - datetime.timedelta(days=REINGEST_DAYS - 1)
+    return day.isoformat()
+
+
+def in_window(values, start):
+    """Masque des lignes dont la date (`values`) est renseignée et au moins `start`."""
+    values = mark_values(values)
+    return (values >= start) & values.str[:1].str.isdigit()
+
+
+def _line_start(body, begin, k):
+    # position dans `body` du début de la k-ième ligne après la position `begin` (début de ligne) ;
+    # les fichiers amont n'ont ni ligne vide ni retour à la ligne entre guillemets
+    body.seek(begin)
+    pos = begin
+    while k:
+        block = body.read(fetch.CHUNK_SIZE)
+        if not block:
+            break
+        newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == ord('\n'))
+        if len(newlines) >= k:
+            return pos + int(newlines[k - 1]) + 1
+        k -= len(newlines)
+        pos += len(block)
+    return pos
+
+
+def _window(r, begin, firsts, mark):
+    # position de la première ligne des jours relus après `mark` ; fin du fichier s'il n'y en a pas
+    rows = firsts[in_window(firsts.index.to_series(), since(mark)).to_numpy()]
+    if not len(rows):
+        return r.length
+    return _line_start(r.body, begin, int(rows.min()))
+
+
+def _state(r, header, df, firsts, source):
+    mark = _last_mark(df[source['mark']])
+    return {
+        'version': source.get('version', 1),
+        'mark': mark,
+        'length': r.length,
+        'tail': base64.b64encode(r.tail).decode(),
+        'header': base64.b64encode(header).decode(),
+        'window': _window(r, len(header), firsts, mark),
+    }
+
+
+def _parse_full(r, name):
+    # réponse complète : (DataFrame, état)
+    header = r.body.readline()
+    r.body.seek(0)
+    df, firsts = _parse(r.body, name, r.length)
+    return df, _state(r, header, df, firsts, SOURCES[name])
+
+
+def full(name):
+    """Lit toute la source `name` ; renvoie (DataFrame brut, état)."""
+    r = _download(name)
+    with r.body:
+        return _parse_full(r, name)
+
+
+def increment(name, state):
+    """Lignes de `name` des jours à partir de ``since(state['mark'])`` ; renvoie (DataFrame brut, nouvel état)."""
+    source = SOURCES[name]
+    tail = base64.b64decode(state['tail'])
+    known = state['length'] - len(tail)
+    r = None
+    # Range seulement s'il évite au moins la moitié du fichier ; sinon (fichier non trié par jour,
+    # état antérieur sans position de fenêtre) relecture complète directe
+    if state.get('window', 0) >= state['length'] // 2:
+        start = min(state['window'], known)
+        try:
+            r = _download(name, headers={'Range': 'bytes=%d-' % start, 'Accept-Encoding': 'identity'})
+        except requests.HTTPError as e:
+            # 416 : le fichier a raccourci
+            if e.response is None or e.response.status_code != 416:
+                raise
+
+    extended = (r is not None and r.status_code == 206 and tail.endswith(b'\n')
+                and r.headers.get('Content-Range', '').startswith('bytes %d-' % start))
+    if extended:
+        r.body.seek(known - start)
+        extended = r.body.read(len(tail)) == tail
+    if extended:
+        # fichier prolongé : seules les lignes à partir de la fenêtre sont lues, derrière l'en-tête connu
+        with r.body:
+            header = base64.b64decode(state['header'])
+            begin = state['window'] - start
+            r.body.seek(begin)
+            df, firsts = _parse(io.BufferedReader(_Prefixed(header, r.body)), name, r.length - begin)
+            mark = max(state['mark'], _last_mark(df[source['mark']]))
+            next_state = {
+                'version': state.get('version', 1),
+                'mark': mark,
+                'length': start + r.length,
+                'tail': base64.b64encode(r.tail).decode(),
+                'header': state['header'],
+                'window': start + _window(r, begin, firsts, mark),
+            }
+    else:
+        # Range refusé ou fichier réécrit : relecture complète
+        if r is None or r.status_code != 200:
+            if r is not None:
+                r.body.close()
+            r = _download(name)
+        with r.body:
+            r.body.seek(0)
+            df, next_state = _parse_full(r, name)
+
+    df = df[in_window(df[source['mark']], since(state['mark']))].reset_index(drop=True)
+    return df, next_state
@@ -0,0 +1,64 @@
+"""Dernière et avant-dernière valeur de chaque indicateur, par zone.
+
+Construit une fois par chargement des données ; le panneau Indicateurs n'y
+fait que des lectures de dictionnaire. Règles :
+
+* chiffres clés : une valeur par (zone, date) selon ``sources.SOURCE_PRIORITY`` ;
+* SI-DEP : classe d'âge 0 (tous âges) ;
+* dernière = date la plus récente où l'indicateur est renseigné.
+"""
+import collections
+
+import pandas as pd
+
+from opencovid.geo import DEPARTMENTS
+from opencovid.sources import dedupe
+
+Latest = collections.namedtuple('Latest', 'date value previous')
+
+CHIFFRES_CLES = ['nouvelles_hospitalisations', 'nouvelles_reanimations', 'deces', 'hospitalises', 'reanimation']
+
+
+def _all_ages(df):
+    # classe 0 = tous âges ; à défaut, somme des classes
+    if (df['cl_age90'] == 0).any():
+        return df[df['cl_age90'] == 0]
+    return df
+
+
+def _long(df, area, date, metrics):
+    # format (area, date, metric, value) ; dates en texte : jour ISO ou semaine glissante
+    out = df.melt(id_vars=[area, date], value_vars=metrics, var_name='metric').rename(
+        columns={area: 'area', date: 'date'})
+    if pd.api.types.is_datetime64_any_dtype(out['date']):
+        out['date'] = out['date'].dt.strftime('%Y-%m-%d')
+    return out.astype({'area': object, 'date': object, 'value': float})
+
+
+def build_latest_index(df, df_dep, df_tid, df_tid_dep):
+    """{(zone, indicateur): Latest} ; zone = 'France' ou nom de département."""
+    cc = df.loc[df['maille_nom'].notna(), ['maille_nom', 'date', 'source_type'] + CHIFFRES_CLES]
+    cc = dedupe(cc, keys=('maille_nom', 'date'))
+
+    dep = _all_ages(df_dep).groupby(['dep', 'jour'], observed=True)[['P', 'T']].sum(min_count=1).reset_index()
+    france = dep.groupby('jour')[['P', 'T']].sum(min_count=1).reset_index().assign(dep='France')
+    dep['dep'] = dep['dep'].astype(object).map(DEPARTMENTS)
+
+    tid = _all_ages(df_tid).assign(fra='France')
+    tid_dep = _all_ages(df_tid_dep).assign(dep=lambda d: d['dep'].astype(object).map(DEPARTMENTS))
+
+    values = pd.concat([
+        _long(cc, 'maille_nom', 'date', CHIFFRES_CLES),
+        _long(pd.concat([france, dep]), 'dep', 'jour', ['P', 'T']),
+        _long(tid, 'fra', 'semaine_glissante', ['tx_id']),
+        _long(tid_dep, 'dep', 'semaine_glissante', ['tx_id']),
+    ], ignore_index=True)
+    values = values.dropna(subset=['area', 'date', 'value'])
+    # les deux dates les plus récentes de chaque (zone, indicateur)
+    last2 = values.sort_values('date', kind='stable').groupby(['area', 'metric'], sort=False).tail(2)
+
+    index = {}
+    for (area, metric), rows in last2.groupby(['area', 'metric'], sort=False):
+        v = rows['value'].tolist()
+        index[(area, metric)] = Latest(rows['date'].iloc[-1], float(v[-1]), float(v[0]) if len(v) == 2 else None)
+    return index
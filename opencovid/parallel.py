@@ -0,0 +1,14 @@
+"""Réglages communs des lots parallèles (``forecast_batch.py``, ``backtest.py``)."""
+import os
+
+BLAS_THREADS_VARS = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS']
+
+
+def limit_blas_threads():
+    """Un seul thread BLAS par processus : le parallélisme vient du pool.
+
+    À appeler avant le premier import de numpy ; une valeur déjà fixée dans
+    l'environnement est gardée.
+    """
+    for var in BLAS_THREADS_VARS:
+        os.environ.setdefault(var, '1')
@@ -0,0 +1,88 @@
+"""Mesure des étapes nommées : chargement des données, sections, figures.
+
+Chaque ``stage(nom)`` produit un enregistrement {stage, seconds, ...}. Il est
+journalisé en JSON (logger ``opencovid.profiling``, et fichier
+``OPENCOVID_PROFILE_LOG`` s'il est défini), gardé dans ``RECENT`` (derniers
+enregistrements du processus) et ajouté au ``profile()`` en cours. Un profil
+regroupe les étapes d'une exécution du script streamlit et il est affiché
+dans l'encadré de débogage si ``OPENCOVID_DEBUG=1``.
+"""
+import collections
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import time
+
+import pandas as pd
+
+DEBUG = os.environ.get('OPENCOVID_DEBUG', '') not in ('', '0')
+LOG_PATH = os.environ.get('OPENCOVID_PROFILE_LOG')
+
+logger = logging.getLogger(__name__)
+if LOG_PATH:
+    _handler = logging.FileHandler(LOG_PATH)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+RECENT = collections.deque(maxlen=500)
+_current = contextvars.ContextVar('profile', default=None)
+
+
+@contextlib.contextmanager
+def profile():
+    """Regroupe les étapes mesurées dans le bloc ; produit la liste des enregistrements."""
+    records = []
+    token = _current.set(records)
+    try:
+        yield records
+    finally:
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def stage(name, **fields):
+    """Mesure le bloc sous le nom `name` ; `fields` (lignes, octets...) complète l'enregistrement.
+
+    Le dict produit par le bloc peut être enrichi pendant la mesure.
+    """
+    record = dict(stage=name, **fields)
+    t = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = round(time.perf_counter() - t, 6)
+        record['time'] = time.time()
+        RECENT.append(record)
+        records = _current.get()
+        if records is not None:
+            records.append(record)
+        logger.info(json.dumps(record, default=str, ensure_ascii=False))
+
+
+def private_memory():
+    """Mémoire anonyme (privée) du processus en Mo, hors fichiers mappés ; NaN hors Linux."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('RssAnon:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float('nan')
+
+
+def frame(records):
+    """Enregistrements sous forme de DataFrame (stage, seconds, puis champs libres)."""
+    df = pd.DataFrame(list(records))
+    if df.empty:
+        return df
+    columns = ['stage', 'seconds'] + [c for c in df.columns if c not in ('stage', 'seconds', 'time')]
+    return df[columns]
+
+
+def recent(prefix):
+    """Derniers enregistrements du processus dont l'étape commence par `prefix`."""
+    return [r for r in RECENT if r['stage'].startswith(prefix)]
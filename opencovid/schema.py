@@ -0,0 +1,76 @@
+"""Schéma typé des jeux de données chargés.
+
+Les libellés deviennent des catégories, les comptes le plus petit entier
+nullable qui les contient, les jours de vraies dates ; coordonnées et taux
+d'incidence sont en float32. ``apply`` est idempotent : il est rejoué après
+concaténation des fichiers d'un snapshot.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SCHEMAS = {
+    'chiffres-cles': {
+        'categories': ['granularite', 'maille_code', 'maille_nom', 'source_nom', 'source_url',
+                       'source_archive', 'source_type'],
+    },
+    'sidep-quot-dep': {'categories': ['dep', 'cl_age90'], 'dates': ['jour']},
+    'sidep-tid-fra': {'categories': ['fra', 'cl_age90'], 'ordered': ['semaine_glissante']},
+    'sidep-tid-dep': {'categories': ['dep', 'cl_age90'], 'ordered': ['semaine_glissante']},
+}
+FLOAT32 = ('lat', 'lon', 'tx_id')
+INT_DTYPES = ('Int8', 'Int16', 'Int32', 'Int64')
+
+
+def _int_dtype(values):
+    """Plus petit entier nullable contenant `values`, ou None si non entières."""
+    values = values.dropna()
+    if len(values) and not (values == np.floor(values)).all():
+        return None
+    lo, hi = (values.min(), values.max()) if len(values) else (0, 0)
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype.lower())
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return None
+
+
+def apply(df, name):
+    """Applique en place le schéma de la source `name` à `df` ; renvoie `df`."""
+    schema = SCHEMAS[name]
+    typed = set(FLOAT32)
+    for col in schema.get('categories', []) + schema.get('ordered', []):
+        if col not in df:
+            continue
+        typed.add(col)
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+        if col in schema.get('ordered', []) and not df[col].cat.ordered:
+            df[col] = df[col].cat.as_ordered()
+    for col in schema.get('dates', []):
+        if col in df:
+            typed.add(col)
+            if not pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in FLOAT32:
+        if col in df and df[col].dtype != np.float32:
+            df[col] = df[col].astype(np.float32)
+    for col in df.columns:
+        if col in typed or not pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_bool_dtype(df[col]):
+            continue
+        dtype = _int_dtype(df[col])
+        if dtype is not None and df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def memory_report(frames):
+    """Mémoire occupée (Mo) par chacun des DataFrames de `frames` ({nom: df})."""
+    report = pd.Series({name: df.memory_usage(deep=True).sum() / 2**20 for name, df in frames.items()},
+                       name='Mo').round(1)
+    logger.info('mémoire des données : %s (total %.1f Mo)',
+                ', '.join('%s %.1f Mo' % item for item in report.items()), report.sum())
+    return report
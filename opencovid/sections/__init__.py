@@ -0,0 +1,33 @@
+"""Sections du tableau de bord, une par case de la barre latérale.
+
+Chaque module expose ``render(data, area)``. Il n'est importé (avec plotly,
+statsmodels...) que lorsque sa case est cochée : le démarrage de
+l'application ne paie que streamlit et le chargement des données.
+"""
+import importlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# (libellé de la case, module)
+SECTIONS = [
+    ('Indicateurs', 'indicateurs'),
+    ('Tendances', 'tendances'),
+    ('Prédictions (30 jours)', 'predictions'),
+    ('Cartes intéractives', 'cartes'),
+    ('Classement des départements', 'classement'),
+]
+
+IMPORT_SECONDS = {}  # module -> durée du premier import
+
+
+def load(module):
+    """Importe la section `module` ; la durée du premier import est journalisée."""
+    if module in IMPORT_SECONDS:
+        return importlib.import_module(__name__ + '.' + module)
+    t = time.perf_counter()
+    mod = importlib.import_module(__name__ + '.' + module)
+    IMPORT_SECONDS[module] = time.perf_counter() - t
+    logger.info('section %s importée en %.2f s', module, IMPORT_SECONDS[module])
+    return mod
@@ -0,0 +1,83 @@
+"""Section Cartes interactives : incidence et animations par département.
+
+Les figures sont mises en cache (JSON) par période et version des données,
+pour toutes les sessions ; voir ``opencovid/figures.py``.
+"""
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from opencovid import figures
+
+MAP = dict(zoom=4, center={'lat':48.862725,'lon':2.287592}, height=800, mapbox_style="open-street-map")
+
+
+def _animation(df, date_col, date1, date2, keys, size, hover_name, adaptive):
+    columns = list(dict.fromkeys([date_col] + keys + ['lat', 'lon', size, hover_name]))
+    df = df.loc[(df[date_col] >= pd.to_datetime(date1)) & (df[date_col] <= pd.to_datetime(date2)), columns]
+    fmt = "%d-%b-%Y"
+    if adaptive:
+        n = df[date_col].nunique()
+        df = figures.animation_frames(df, date_col, keys, [size])
+        if df[date_col].nunique() < n:
+            fmt = "semaine du %d-%b-%Y"
+    df = df.assign(dt_str=df[date_col].dt.strftime(fmt))
+    return px.scatter_mapbox(df, lat="lat", lon="lon", size=size, hover_name=hover_name,
+                             animation_frame="dt_str", **MAP)
+
+
+def render(data, area):
+    df_depts, cube, incidence = data.df_depts, data.cube, data.incidence
+    cache = figures.cache()
+
+    st.markdown("""
+    ## Cartes interactives
+    """)
+    
+    st.markdown("""
+    #### France : Taux d'incidence
+    """)
+    # 7 jours glissants au dernier jour, tous âges
+    fig1_2 = cache.get(('incidence',) + incidence.version,
+                       lambda: px.scatter_mapbox(incidence.ranking().dropna(subset=['tx_id', 'lat', 'lon']),
+                                                 lat="lat", lon="lon", size="tx_id", hover_name="departement",
+                                                 hover_data=['tx_pos', 'croissance'], color="tx_id", **MAP))
+    
+    st.plotly_chart(fig1_2)
+
+    st.markdown("""
+    ### Période à étudier :
+    """)
+    
+    col1, col2 = st.columns(2)
+    date1 = col1.date_input('Date de début', value=pd.to_datetime(cube.last_day))
+    date2 = col2.date_input('Date de fin', value=pd.to_datetime(cube.last_day))
+    adaptive = st.checkbox('Animation allégée (par semaine au-delà de %d jours)' % figures.MAX_FRAMES, value=True)
+    
+    st.markdown("""
+    #### France : Évolution des 'Nouvelles hospitalisations'
+    ##### (animation)
+    """)
+    
+    try:
+    	fig1_0 = cache.get(('hospitalisations', str(date1), str(date2), adaptive, figures.data_version(df_depts, 'date')),
+    	                   lambda: _animation(df_depts, 'date', date1, date2, ['maille_nom'],
+    	                                      "nouvelles_hospitalisations", "maille_nom", adaptive))
+    
+    	st.plotly_chart(fig1_0)
+    except KeyError:
+    	st.write('Dates incorrectes')
+        
+    st.markdown("""
+    #### France : Évolution des cas positifs
+    ##### (animation)
+    """)
+    
+    try:
+    	fig1_1 = cache.get(('positifs', str(date1), str(date2), adaptive, figures.data_version(cube.departments, 'jour')),
+    	                   lambda: _animation(cube.departments, 'jour', date1, date2, ['dep'],
+    	                                      "P", "dep", adaptive))
+    
+    	st.plotly_chart(fig1_1)
+    except KeyError:
+    	st.write('Dates incorrectes')
@@ -0,0 +1,33 @@
+"""Section Classement : indicateurs glissants de tous les départements."""
+import plotly.express as px
+import streamlit as st
+
+from opencovid.incidence import METRICS
+
+LABELS = {'tx_id': "Taux d'incidence", 'tx_pos': 'Taux de positivité (%)', 'croissance': 'Évolution sur 7 jours (%)'}
+
+
+def render(data, area):
+    incidence = data.incidence
+
+    st.markdown("""
+    ## Classement des départements
+    """)
+    st.write('Indicateurs sur 7 jours glissants au', str(incidence.last_day)[:10])
+
+    col1, col2 = st.columns(2)
+    metric = col1.selectbox('Indicateur', METRICS, format_func=LABELS.get)
+    age = col2.selectbox("Classe d'âge (0 : tous âges)", incidence.ages)
+
+    ranking = incidence.ranking(age).sort_values(metric, ascending=False)
+    st.dataframe(ranking[['dep', 'departement'] + list(METRICS)])
+
+    st.markdown("""
+    #### Évolution sur 60 jours
+    """)
+    # départements dans l'ordre du classement
+    matrix = incidence.matrix(metric, age).reindex(ranking['dep'])
+    matrix.index = ranking['departement'].fillna(ranking['dep'])
+    fig = px.imshow(matrix, aspect='auto', color_continuous_scale='Reds', labels={'color': LABELS[metric]},
+                    height=1600)
+    st.plotly_chart(fig)
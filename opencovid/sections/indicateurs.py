@@ -0,0 +1,63 @@
+"""Section Indicateurs : dernières valeurs nationales et de la zone choisie."""
+import plotly.graph_objects as go
+import streamlit as st
+
+GAUGE_INCIDENCE = {'axis': {'range': [None, 160]},
+                   'steps' : [
+                       {'range': [0, 10], 'color': "lightgray"},
+                       {'range': [10, 50], 'color': "gray"},
+                       {'range': [50, 100], 'color': "orange"}],
+                   'threshold': {'line': {'color': "red", 'width': 4}, 'thickness': 0.75, 'value': 50}}
+
+
+def indicator(latest, key, title, gauge=None):
+    # dernière valeur (et variation) de l'indicateur key = (zone, indicateur)
+    l = latest.get(key)
+    if l is None:
+        return go.Figure(go.Indicator(mode="number", value=None, title={'text': title+" (indisponible)"}))
+    return go.Figure(go.Indicator(
+        mode = "gauge+number+delta" if gauge else "number+delta",
+        value = l.value,
+        title = {'text': title+" ("+l.date+")"},
+        delta = {'reference': l.previous} if l.previous is not None else None,
+        gauge = gauge,
+        ))
+
+
+def render(data, area):
+    latest = data.latest
+
+    st.markdown("""
+    ## Données nationales (Indicateurs)
+    """)
+    
+    #Indicators (National)
+    
+    fig0_1 = indicator(latest, ('France', 'nouvelles_hospitalisations'), "Nouvelles hospitalisations")
+    fig0_2 = indicator(latest, ('France', 'nouvelles_reanimations'), "Nouvelles réanimations")
+    fig0_3 = indicator(latest, ('France', 'P'), "Nouveaux cas positifs")
+    fig0_4 = indicator(latest, ('France', 'tx_id'), "Taux d'incidence", gauge=GAUGE_INCIDENCE)
+    fig0_5 = indicator(latest, ('France', 'tx_pos'), "Taux de positivité (%)")
+    
+    for fig in (fig0_1, fig0_2, fig0_3, fig0_4, fig0_5):
+        st.plotly_chart(fig)
+    
+    st.markdown("""
+    ## Données sur la 'zone' sélectionnée
+    """)
+    
+    # st_display
+    st.write('Vous avez choisi: ', area)
+    
+    # indicateurs (zone sélectionnée)
+    ind1_1 = indicator(latest, (area, 'tx_id'), "Taux d'incidence ("+area+")", gauge=GAUGE_INCIDENCE)
+    ind1_2 = indicator(latest, (area, 'deces'), "Nombre de décès (cumulé)")
+    ind1_3 = indicator(latest, (area, 'nouvelles_hospitalisations'), "Nouvelles hospitalisations")
+    ind1_4 = indicator(latest, (area, 'nouvelles_reanimations'), "Nouvelles réanimations")
+    ind1_5 = indicator(latest, (area, 'T'), "Nombre de personnes testées")
+    ind1_6 = indicator(latest, (area, 'P'), "Nombre de cas positifs")
+    ind1_7 = indicator(latest, (area, 'tx_pos'), "Taux de positivité (%)")
+    ind1_8 = indicator(latest, (area, 'croissance'), "Évolution des cas sur 7 jours (%)")
+    
+    for fig in (ind1_1, ind1_2, ind1_3, ind1_4, ind1_5, ind1_6, ind1_7, ind1_8):
+        st.plotly_chart(fig)
@@ -0,0 +1,52 @@
+"""Section Prédictions : cas positifs à 30 jours (SARIMAX).
+
+statsmodels n'est importé qu'au premier ajustement (``forecast.fit_forecast``).
+"""
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from opencovid import forecast
+
+
+def _forecast(engine, name, y, spec):
+    fc, fresh = engine.get(name, y, spec)
+    if fc is None:
+        with st.spinner('Ajustement du modèle SARIMAX...'):
+            fc = engine.wait(name, y, spec)
+    elif not fresh:
+        st.info('Prévision calculée sur les données au '+str(fc.last_observation)[:10]+', mise à jour en cours.')
+    return fc
+
+
+def render(data, area):
+    cube, depts = data.cube, data.depts
+
+    st.markdown("""
+    ## Prédictions sur 30 jours
+    """)
+    st.markdown("""
+    ### France : Cas positifs à 30 jours
+    """)
+    engine = forecast.engine()
+    
+    p = forecast.national_series(cube)
+    fc = _forecast(engine, 'France', p, engine.model_for('France', forecast.NATIONAL))
+    
+    p_pred = pd.concat([p.rename('Cas Positifs'), fc.prediction.rename('Prédictions')], axis=1) # Concaténation des prédictions
+    
+    fig_p = px.line(p_pred)
+    st.plotly_chart(fig_p)
+    
+    st.markdown("""
+    ### Département sélectionné : Cas positifs à 30 jours
+    """)
+    st.write(area)
+
+    p2 = forecast.department_series(cube, depts[area])
+    fc2 = _forecast(engine, depts[area], p2, engine.model_for(depts[area], forecast.DEPARTMENT))
+    
+    p2_pred = pd.concat([p2.rename('Cas Positifs'), fc2.prediction.rename('Prédictions')], axis=1) # Concaténation des prédictions
+    
+    fig_p2 = px.line(p2_pred)
+    st.plotly_chart(fig_p2)
@@ -0,0 +1,131 @@
+"""Section Tendances : évolutions France et zone choisie.
+
+Les longues séries sont réduites à ``downsample.POINTS`` points par trace ;
+une période plus courte les affiche en pleine résolution.
+"""
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from opencovid import downsample
+
+
+def _period(df, col, date1, date2):
+    return df[(df[col] >= pd.to_datetime(date1)) & (df[col] <= pd.to_datetime(date2))]
+
+
+def render(data, area):
+    df, df_dep, cube, depts = data.df, data.df_dep, data.cube, data.depts
+
+    st.markdown("""
+    ## Tendances
+    """)
+
+    # période affichée : en la réduisant, on retrouve la pleine résolution
+    col1, col2 = st.columns(2)
+    date1 = col1.date_input('Début de la période', value=min(df['date'].min(), cube.france.index.min()))
+    date2 = col2.date_input('Fin de la période', value=max(df['date'].max(), pd.to_datetime(cube.last_day)))
+
+    st.markdown("""
+    ### France
+    #### Évolution des cas testés et positifs (P)
+    """)
+    f0 = px.bar(downsample.bars(_period(cube.national('P'), 'jour', date1, date2), 'jour', 'P'), x='jour', y='P')
+    st.plotly_chart(f0)
+    
+    st.markdown("""
+    ### France
+    #### Évolution des personnes testées (T)
+    """)
+    f0_1 = px.bar(downsample.bars(_period(cube.national('T'), 'jour', date1, date2), 'jour', 'T'), x='jour', y='T')
+    st.plotly_chart(f0_1)
+    
+    st.markdown("""
+    ### Par zone :
+    #### Les 10 derniers jours (Nouvelles hospitalisations, Nouvelles réanimations) 
+    """)
+    st.write(area)
+    
+    # création du df_area
+    df_area = df[df['maille_nom'] == area]
+    
+    # fig 1 : hosp/reas last10 days
+    # plotly chart 1
+    df_last10 = df_area.tail(10)
+    df1 = df_last10.melt(id_vars='date', value_vars=['nouvelles_hospitalisations', 'nouvelles_reanimations'])
+    fig1 = px.line(df1, x='date' , y='value' , color='variable')
+    st.plotly_chart(fig1)
+    
+    st.markdown("""
+    #### Décès, Hospitalisés 
+    ##### par zone:
+    """)
+    st.write(area)
+    
+    # fig2 : ['deces','hospitalises']
+    # plotly chart 2
+    df2 = df_area.melt(id_vars='date', value_vars=['deces','hospitalises'])
+    df2 = downsample.lines(_period(df2, 'date', date1, date2), 'date', 'value', color='variable')
+    fig2 = px.line(df2, x='date' , y='value' , color='variable')
+    st.plotly_chart(fig2)
+    
+    st.markdown("""
+    #### Réanimations
+    ##### par zone:
+    """)
+    st.write(area)
+    
+    # fig3 : ['reanimation']
+    # plotly chart 3
+    df3 = downsample.lines(_period(df_area, 'date', date1, date2), 'date', 'reanimation')
+    fig3 = px.line(df3, x='date', y='reanimation')
+    st.plotly_chart(fig3)
+    
+    st.markdown("""
+    ### Données sur le Système d’Informations de DEPistage (SI-DEP)
+    
+    Le Système d’Informations de DEPistage (SI-DEP)
+    Le nouveau système d’information de dépistage (SI-DEP), en déploiement depuis le 13 mai 2020, est une plateforme sécurisée où sont systématiquement enregistrés les résultats des laboratoires des tests réalisés par l’ensemble des laboratoires de ville et établissements hospitaliers concernant le SARS-COV2.
+    
+    La création de ce système d'information est autorisée pour une durée de 6 mois à compter de la fin de l'état d'urgence sanitaire par application du décret n° 2020-551 du 12 mai 2020 relatif aux systèmes d’information mentionnés à l’article 11 de la loi n° 2020-546 du 11 mai 2020 prorogeant l’état d’urgence sanitaire et complétant ses dispositions.
+    
+    #### Description des données
+    Le présent jeu de données renseigne à l'échelle départementale et régionale :
+    
+    * le nombre de personnes testées (`T`) et le nombre de personnes déclarées positives (`P`) par classe d'âge (`cl_age90`) ;
+    * le nombre de personnes positives sur 7 jours glissants (`pop`).
+    
+    ##### Taux d'incidence
+    Le taux d'incidence correspond au nombre de cas positifs au Covid-19 pour 100 000 habitants. La formule utilisée pour calculer ce fameux taux est la suivante : nombre de personnes positives multiplié par 100 000, le tout divisé par le nombre d'habitants de la zone étudiée.
+    Lorsque le taux d'incidence dépasse 10 cas positifs pour 100 000 habitants sur sept jours, le département atteint un premier «seuil de vigilance». Au-delà de 50 cas positifs en une semaine, on atteint le «seuil d'alerte».
+    
+    """)
+    
+    df_dep_area = df_dep[df_dep['dep'] == depts[area]]
+    st.write(df_dep_area.head())
+    
+    st.markdown("""
+    #### Évolution du nombre de personnes testées
+    """)
+    st.write(area)
+    
+    df_tested = cube.department_by_age(depts[area])
+    st.write('Nombre de personnes testées le ', str(df_tested.tail(1)['jour'].values[0])[:10], ' : ', df_tested.tail(1)['T'].values[0])
+    
+    # plotly fig 5
+    fig5 = px.bar(data_frame=downsample.bars(_period(df_tested, 'jour', date1, date2), 'jour', 'T'),
+                  x='jour', y='T', color='cl_age90')
+    st.plotly_chart(fig5)
+         
+    st.markdown("""
+    #### Évolution du nombre de cas positifs
+    """)
+    st.write(area)
+    
+    df_pos = cube.department_by_age(depts[area])
+    st.write('Nombre de cas positifs le ', str(df_pos.tail(1)['jour'].values[0])[:10], ' : ', df_pos.tail(1)['P'].values[0])
+    
+    # plotly fig 6
+    fig6 = px.bar(data_frame=downsample.bars(_period(df_pos, 'jour', date1, date2), 'jour', 'P'),
+                  x='jour', y='P', color='cl_age90')
+    st.plotly_chart(fig6)
@@ -0,0 +1,226 @@
+"""Service de données partagé, en lecture seule, entre sessions et processus.
+
+Les jeux de données préparés sont publiés dans ``DATA_DIR`` sous forme de
+versions : un répertoire ``v-<horodatage>`` de fichiers Arrow (Feather non
+compressé) et de tableaux numpy, plus un fichier ``CURRENT`` désignant la
+version courante. Ce fichier est remplacé atomiquement (``os.replace``),
+donc un lecteur voit l'ancienne ou la nouvelle version, jamais un mélange.
+
+Le processus qui publie calcule aussi agrégats, indicateurs glissants et
+dernières valeurs. Les autres mappent en mémoire les fichiers de la version
+courante, sans rien recalculer ; les pages sont partagées par le noyau entre
+tous les processus du nœud. Les colonnes sont écrites sans masque de
+validité Arrow (entiers numpy, ou flottants avec NaN s'il manque des
+valeurs ; NaT comme valeur) : ``to_pandas`` en fait des vues en lecture
+seule sur ces pages, sans copie par processus. La mémoire privée ajoutée
+par l'ouverture d'une version est mesurée (``service.open``, ``private_mb``).
+
+Au-delà de ``DATA_TTL`` secondes, un seul processus (verrou fichier)
+republie une version à partir des snapshots, en arrière-plan ; les sessions
+continuent d'être servies par la version précédente. Si aucune source n'a
+été relue en amont depuis la version courante, rien n'est écrit : seule
+l'échéance de ``CURRENT`` est repoussée. Seules les
+``KEEP_VERSIONS`` dernières versions sont gardées sur disque.
+"""
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from opencovid import data, profiling, snapshot
+from opencovid.aggregates import TestingCube
+from opencovid.geo import depts
+from opencovid.incidence import IncidenceEngine
+from opencovid.latest import Latest
+
+DATA_DIR = os.environ.get('OPENCOVID_DATA_DIR', '.data')
+DATA_TTL = float(os.environ.get('OPENCOVID_DATA_TTL', 3600))
+CHECK_INTERVAL = 10  # secondes entre deux lectures de CURRENT
+KEEP_VERSIONS = 2
+FRAMES = ('df', 'df_dep', 'df_tid', 'df_tid_dep', 'df_depts')
+
+logger = logging.getLogger(__name__)
+
+
+def _current_path(root):
+    return os.path.join(root, 'CURRENT')
+
+
+def read_current(root=DATA_DIR):
+    """Version courante : {'version', 'published_at'}, ou None si rien n'est publié."""
+    try:
+        with open(_current_path(root)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_current(root, current):
+    with open(_current_path(root) + '.tmp', 'w') as f:
+        json.dump(current, f)
+    os.replace(_current_path(root) + '.tmp', _current_path(root))
+
+
+def _column(values):
+    # colonne Arrow sans masque de validité (hors catégories) : to_pandas en fait une vue sur le fichier
+    # mappé. Entiers nullables : entiers numpy, ou flottants avec NaN s'il manque des valeurs.
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return pa.array(values)  # codes lus sans copie, -1 pour les manquants
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(dtype):
+        if values.isna().any():
+            return pa.array(values.to_numpy(dtype=np.float32 if dtype.itemsize <= 2 else np.float64,
+                                            na_value=np.nan))
+        return pa.array(values.to_numpy(dtype=dtype.numpy_dtype))
+    if pd.api.types.is_datetime64_dtype(dtype):
+        # NaT gardé comme valeur sentinelle, pas comme null
+        ns = np.ascontiguousarray(values.to_numpy(dtype='datetime64[ns]').view(np.int64))
+        return pa.Array.from_buffers(pa.timestamp('ns'), len(ns), [None, pa.py_buffer(ns)])
+    return pa.array(values.to_numpy())  # flottants : NaN gardés comme valeurs
+
+
+def _write_table(df, path):
+    table = pa.table({str(col): _column(df[col]) for col in df.columns})
+    # un seul bloc : des colonnes en plusieurs morceaux seraient recopiées à la lecture
+    feather.write_feather(table, path, compression='uncompressed', chunksize=max(len(table), 1))
+
+
+def _read_table(path):
+    return feather.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+
+
+def publish(frames, root=DATA_DIR, sources=None, previous=None):
+    """Prépare le dataset de `frames` ({nom: DataFrame}), l'écrit dans une nouvelle version et la rend courante.
+
+    Agrégats, indicateurs glissants (complétés depuis ceux de `previous`,
+    Dataset précédent) et dernières valeurs sont calculés ici, une fois par
+    nœud. `sources` (versions des sources, ``snapshot.versions()``) est gardé
+    dans ``CURRENT`` pour reconnaître une republication sans changement.
+    """
+    dataset = data.build_dataset(frames, previous)
+    now = time.time()
+    version = 'v-%s-%d' % (time.strftime('%Y%m%d-%H%M%S', time.localtime(now)), os.getpid())
+    tmp = os.path.join(root, version + '.tmp')
+    os.makedirs(os.path.join(tmp, 'incidence'), exist_ok=True)
+    for name in FRAMES:
+        _write_table(frames[name], os.path.join(tmp, name + '.arrow'))
+    for name, table in dataset.cube.tables().items():
+        _write_table(table, os.path.join(tmp, 'cube_%s.arrow' % name))
+    meta, arrays = dataset.incidence.to_arrays()
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp, 'incidence', name + '.npy'), values)
+    with open(os.path.join(tmp, 'incidence', 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    with open(os.path.join(tmp, 'latest.json'), 'w') as f:
+        json.dump([[area, metric] + list(value) for (area, metric), value in dataset.latest.items()], f)
+    os.replace(tmp, os.path.join(root, version))
+    current = {'version': version, 'published_at': now, 'sources': sources}
+    _write_current(root, current)
+    # anciennes versions : un processus qui les mappe encore garde ses pages
+    versions = sorted(d for d in os.listdir(root) if d.startswith('v-') and not d.endswith('.tmp'))
+    for old in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    logger.info('données publiées : %s', version)
+    return current
+
+
+def open_dataset(version, root=DATA_DIR):
+    """Dataset de `version`, mappé en mémoire : rien n'est recalculé ni copié, hors petits index."""
+    path = os.path.join(root, version)
+    frames = {name: _read_table(os.path.join(path, name + '.arrow')) for name in FRAMES}
+    cube = TestingCube.from_tables({name: _read_table(os.path.join(path, 'cube_%s.arrow' % name))
+                                    for name in ('age', 'dep', 'map')})
+    with open(os.path.join(path, 'incidence', 'meta.json')) as f:
+        meta = json.load(f)
+    arrays = {name[:-4]: np.load(os.path.join(path, 'incidence', name), mmap_mode='r')
+              for name in os.listdir(os.path.join(path, 'incidence')) if name.endswith('.npy')}
+    with open(os.path.join(path, 'latest.json')) as f:
+        latest = {(area, metric): Latest(*value) for area, metric, *value in json.load(f)}
+    return data.Dataset(frames['df'], frames['df_dep'], frames['df_tid'], frames['df_tid_dep'], frames['df_depts'],
+                        depts, cube, latest, IncidenceEngine.from_arrays(meta, arrays))
+
+
+class DataService:
+    """Dataset courant, partagé par toutes les sessions du processus."""
+
+    def __init__(self, root=DATA_DIR, ttl=DATA_TTL, load=data.load_frames):
+        self.root = root
+        self.ttl = ttl
+        self.load = load
+        self.version = None
+        self._dataset = None
+        self._checked_at = 0.
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def _refresh(self, wait):
+        # un seul processus du nœud republie ; les autres servent la version courante
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, 'LOCK'), 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+            except BlockingIOError:
+                return read_current(self.root)
+            current = read_current(self.root)
+            if current is not None and time.time() - current['published_at'] < self.ttl:
+                return current  # republiée par un autre processus entre-temps
+            with profiling.stage('service.publish') as record:
+                frames = self.load()
+                sources = snapshot.versions()
+                record['skipped'] = bool(sources) and current is not None and current.get('sources') == sources
+                if record['skipped']:
+                    # aucune source relue : même version, seule l'échéance est repoussée
+                    current = dict(current, published_at=time.time())
+                    _write_current(self.root, current)
+                    return current
+                return publish(frames, self.root, sources, self._dataset)
+
+    def _refresh_background(self):
+        try:
+            self._refresh(wait=False)
+        except Exception:
+            logger.exception('rafraîchissement des données en échec, version %s servie', self.version)
+        finally:
+            self._refreshing = False
+
+    def get(self):
+        """Dataset de la version courante (chargé au premier appel)."""
+        now = time.time()
+        if self._dataset is not None and now - self._checked_at < CHECK_INTERVAL:
+            return self._dataset
+        with self._lock:
+            current = read_current(self.root)
+            if current is None:
+                current = self._refresh(wait=True)
+            elif now - current['published_at'] >= self.ttl and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh_background, name='data-refresh', daemon=True).start()
+            if current['version'] != self.version:
+                with profiling.stage('service.open', version=current['version']) as record:
+                    before = profiling.private_memory()
+                    self._dataset = open_dataset(current['version'], self.root)
+                    record['private_mb'] = profiling.private_memory() - before
+                self.version = current['version']
+            self._checked_at = now
+            return self._dataset
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def service():
+    """DataService du processus (singleton)."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = DataService()
+        return _service
@@ -0,0 +1,201 @@
+"""Snapshots locaux (Parquet) des jeux de données préparés.
+
+Chaque source est enregistrée après préparation dans ``SNAPSHOT_DIR/<source>/``
+sous forme de fichiers ``part-NNNNN.parquet`` : le premier contient
+l'historique, les suivants les jours lus par ingestion incrémentale (voir
+``opencovid/ingest.py``). Les lignes des jours relus par une mise à jour
+remplacent celles du snapshot : les fichiers qui en contiennent, en général
+le dernier seul, sont réécrits. Les fichiers sont regroupés au-delà de
+``MAX_PARTS``.
+
+Une source n'est relue en amont que si son ETag/Last-Modified a changé, et
+ces en-têtes ne sont revérifiés qu'une fois ``SNAPSHOT_TTL`` secondes
+écoulées. En mode hors-ligne (``OPENCOVID_OFFLINE=1``) ou si le réseau est
+indisponible, le dernier snapshot valide est servi.
+"""
+import contextvars
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from opencovid import fetch, ingest, profiling
+from opencovid.sources import SOURCES
+
+SNAPSHOT_DIR = os.environ.get('OPENCOVID_SNAPSHOT_DIR', '.snapshots')
+SNAPSHOT_TTL = float(os.environ.get('OPENCOVID_SNAPSHOT_TTL', 6 * 3600))
+OFFLINE = os.environ.get('OPENCOVID_OFFLINE', '') not in ('', '0')
+MAX_PARTS = 30
+
+logger = logging.getLogger(__name__)
+_meta_lock = threading.Lock()
+
+
+def _meta_path():
+    return os.path.join(SNAPSHOT_DIR, 'meta.json')
+
+
+def _parts(name):
+    return sorted(glob.glob(os.path.join(SNAPSHOT_DIR, name, 'part-*.parquet')))
+
+
+def _read_meta():
+    try:
+        with open(_meta_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _update_meta(name, entry):
+    # les sources sont chargées en parallèle : relecture sous verrou
+    with _meta_lock:
+        meta = _read_meta()
+        meta[name] = entry
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        tmp = _meta_path() + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f, indent=1)
+        os.replace(tmp, _meta_path())
+
+
+def _write_part(name, df, index):
+    path = os.path.join(SNAPSHOT_DIR, name, 'part-%05d.parquet' % index)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def _reset_frame(name, df, start):
+    # historique, puis lignes des jours à partir de `start` dans un fichier à part
+    old = _parts(name)
+    window = ingest.in_window(df[SOURCES[name]['mark']], start)
+    written = {_write_part(name, df[~window], 0)}
+    if window.any():
+        written.add(_write_part(name, df[window], 1))
+    # numéros non contigus après _replace_window : on retire tout fichier non réécrit
+    for path in old:
+        if path not in written:
+            os.remove(path)
+
+
+def _replace_window(name, df, start):
+    # remplace les lignes des jours à partir de `start` par `df`
+    mark = SOURCES[name]['mark']
+    parts = _parts(name)
+    if len(parts) >= MAX_PARTS:
+        old = _read_frame(name)
+        _reset_frame(name, pd.concat([old[~ingest.in_window(old[mark], start)], df], ignore_index=True), start)
+        return
+    index = int(os.path.basename(parts[-1])[5:10])
+    for path in parts:
+        # en général seul le dernier fichier en contient ; la colonne de date suffit pour le savoir
+        if not ingest.in_window(pd.read_parquet(path, columns=[mark])[mark], start).any():
+            continue
+        part = pd.read_parquet(path)
+        part = part[~ingest.in_window(part[mark], start)]
+        if len(part) or path == parts[0]:
+            _write_part(name, part, int(os.path.basename(path)[5:10]))
+        else:
+            os.remove(path)
+    if len(df):
+        _write_part(name, df, index + 1)
+
+
+def _read_frame(name):
+    parts = [pd.read_parquet(path) for path in _parts(name)]
+    if len(parts) == 1:
+        return parts[0]
+    return pd.concat(parts, ignore_index=True)
+
+
+def versions():
+    """Date de dernière ingestion de chaque source snapshotée : {nom: fetched_at}.
+
+    Elle ne change que si des lignes ont été lues en amont (modes ``full`` et
+    ``increment``).
+    """
+    return {name: entry['fetched_at'] for name, entry in sorted(_read_meta().items()) if 'fetched_at' in entry}
+
+
+def remote_validators(name):
+    """ETag / Last-Modified de la source `name` (requête HEAD, redirections suivies)."""
+    source = SOURCES[name]
+    headers = fetch.head(source['url'], timeout=source.get('timeout', fetch.TIMEOUT))
+    return {k: headers[k] for k in ('ETag', 'Last-Modified') if k in headers}
+
+
+def load(name, prepare):
+    """Renvoie le DataFrame préparé de la source `name`.
+
+    `prepare(df)` enrichit les lignes brutes lues en amont ; il n'est appelé
+    que sur les lignes nouvelles depuis le dernier snapshot.
+    """
+    with profiling.stage('load.%s' % name) as record:
+        df, record['mode'] = _load(name, prepare)
+        record['rows'] = len(df)
+    return df
+
+
+def _prepare(name, prepare, raw):
+    with profiling.stage('load.%s.prepare' % name, rows=len(raw)):
+        return prepare(raw)
+
+
+def _load(name, prepare):
+    # renvoie (DataFrame, mode de chargement)
+    entry = _read_meta().get(name)
+    have_snapshot = entry is not None and 'state' in entry and bool(_parts(name))
+    # snapshot d'un format antérieur : reconstruit dès que la source est joignable
+    outdated = have_snapshot and entry['state'].get('version', 1) != SOURCES[name].get('version', 1)
+
+    if have_snapshot and (OFFLINE or (not outdated and time.time() - entry['checked_at'] < SNAPSHOT_TTL)):
+        return _read_frame(name), 'snapshot'
+
+    try:
+        validators = remote_validators(name)
+        if have_snapshot and not outdated and validators and validators == entry['validators']:
+            # source inchangée : on repousse la prochaine vérification
+            entry['checked_at'] = time.time()
+            _update_meta(name, entry)
+            return _read_frame(name), 'unchanged'
+        if have_snapshot and not outdated:
+            raw, state = ingest.increment(name, entry['state'])
+        else:
+            raw, state = ingest.full(name)
+    except OSError as e:
+        if not have_snapshot:
+            raise
+        logger.warning('%s : réseau indisponible (%s), snapshot du %s servi',
+                       name, e, time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['fetched_at'])))
+        return _read_frame(name), 'fallback'
+
+    incremental = have_snapshot and not outdated
+    if incremental:
+        start = ingest.since(entry['state']['mark'])
+        logger.info('%s : %d lignes depuis le %s', name, len(raw), start)
+        _replace_window(name, _prepare(name, prepare, raw), start)
+    else:
+        _reset_frame(name, _prepare(name, prepare, raw), ingest.since(state['mark']))
+    now = time.time()
+    _update_meta(name, {'validators': validators, 'state': state, 'checked_at': now, 'fetched_at': now})
+    return _read_frame(name), 'increment' if incremental else 'full'
+
+
+def load_all(prepares):
+    """Charge en parallèle les sources de `prepares` ({nom: prepare}) ; renvoie {nom: DataFrame}.
+
+    Chaque source est téléchargée, parsée et enrichie dans son propre thread,
+    sans attendre les autres.
+    """
+    with ThreadPoolExecutor(max_workers=len(prepares)) as pool:
+        # contexte copié : les étapes mesurées rejoignent le profil de l'appelant
+        futures = {name: pool.submit(contextvars.copy_context().run, load, name, prepare)
+                   for name, prepare in prepares.items()}
+        return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,109 @@
+"""Sources de données amont (opencovid19-fr et data.gouv.fr).
+
+``mark`` est la colonne de date qui sert de point de reprise à l'ingestion
+incrémentale ; ``dtype`` force le type des codes pour que les fichiers
+partiels se lisent comme le fichier complet. ``timeout`` est le couple
+(connexion, lecture) en secondes passé aux requêtes HTTP.
+
+Une source avec ``dedupe`` est lue par blocs de ``CHUNK_ROWS`` lignes : seules
+les colonnes ``usecols`` et les lignes dont ``keep`` retient les valeurs sont
+gardées, puis chaque bloc est réduit à une ligne par clé ``dedupe`` (voir
+``reduce_sources``). ``version`` change quand la forme des lignes ingérées
+change : les snapshots d'une version antérieure sont reconstruits.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 100000
+# jours déjà ingérés relus à chaque mise à jour (lignes arrivées en retard)
+REINGEST_DAYS = int(os.environ.get('OPENCOVID_REINGEST_DAYS', 3))
+
+SOURCES = {
+    # chiffres clés opencovid19-fr (github)
+    'chiffres-cles': {
+        'url': 'https://github.com/opencovid19-fr/data/raw/master/dist/chiffres-cles.csv',
+        'sep': ',',
+        'mark': 'date',
+        'timeout': (10, 120),
+        'dtype': {'maille_code': str},
+        'usecols': ['date', 'granularite', 'maille_code', 'maille_nom', 'cas_confirmes', 'deces', 'reanimation',
+                    'hospitalises', 'nouvelles_hospitalisations', 'nouvelles_reanimations', 'gueris', 'source_type'],
+        'keep': {'granularite': ['pays', 'departement']},
+        'dedupe': ('date', 'maille_code'),
+        'version': 2,
+    },
+    # SI-DEP : tests et cas positifs quotidiens par département et classe d'âge
+    'sidep-quot-dep': {
+        'url': 'https://www.data.gouv.fr/fr/datasets/r/406c6a23-e283-4300-9484-54e78c8ae675',
+        'sep': ';',
+        'mark': 'jour',
+        'timeout': (10, 120),
+        'dtype': {'dep': str},
+    },
+    # SI-DEP : taux d'incidence France (semaine glissante)
+    'sidep-tid-fra': {
+        'url': 'https://www.data.gouv.fr/fr/datasets/r/cbd6477e-bda6-485d-afdc-8e61b904d771',
+        'sep': ';',
+        'mark': 'semaine_glissante',
+        'timeout': (10, 30),
+    },
+    # SI-DEP : taux d'incidence par département (semaine glissante)
+    'sidep-tid-dep': {
+        'url': 'https://www.data.gouv.fr/fr/datasets/r/3c18e242-7d45-44f2-ac70-dee78a38ee1c',
+        'sep': ';',
+        'mark': 'semaine_glissante',
+        'timeout': (10, 120),
+        'dtype': {'dep': str},
+    },
+}
+
+# chiffres-cles.csv : plusieurs lignes par (date, zone), une par source.
+# Pour chaque indicateur on garde la valeur de la source la mieux classée
+# qui le renseigne ; les types absents de la liste passent en dernier.
+# OPENCOVID_SOURCE_PRIORITY (types séparés par des virgules) remplace cet ordre.
+SOURCE_PRIORITY = [
+    'ministere-sante',
+    'sante-publique-france-data',
+    'sante-publique-france',
+    'agences-regionales-sante',
+    'prefectures',
+    'opencovid19-fr',
+]
+if os.environ.get('OPENCOVID_SOURCE_PRIORITY'):
+    SOURCE_PRIORITY = [s.strip() for s in os.environ['OPENCOVID_SOURCE_PRIORITY'].split(',') if s.strip()]
+
+
+def _rank(df, priority):
+    return df['source_type'].astype(object).map({s: i for i, s in enumerate(priority)}).fillna(len(priority))
+
+
+def dedupe(df, keys=('date', 'maille_code'), priority=SOURCE_PRIORITY):
+    """Une ligne par `keys` : chaque colonne prend la première valeur renseignée par ordre de `priority`."""
+    ordered = df.iloc[_rank(df, priority).to_numpy().argsort(kind='stable')]
+    return ordered.groupby(list(keys), observed=True, sort=True).first().reset_index()
+
+
+def reduce_sources(df, keys=('date', 'maille_code'), priority=SOURCE_PRIORITY):
+    """Réduction de `df` à une ligne par `keys`, comme ``dedupe``, avec le rang des valeurs retenues.
+
+    Renvoie (valeurs, rangs), indexés par `keys` : rangs[c] est le rang de la
+    source qui a fourni valeurs[c] (NaN si aucune). ``merge_sources`` combine
+    deux réductions comme si leurs lignes avaient été dédupliquées ensemble.
+    """
+    rank = _rank(df, priority).to_numpy()
+    values = dedupe(df, keys, priority).set_index(list(keys))
+    columns = list(values.columns)
+    ranks = pd.DataFrame(np.where(df[columns].notna(), rank[:, None], np.nan), columns=columns, index=df.index)
+    ranks = ranks.groupby([df[k] for k in keys], observed=True, sort=True).min()
+    return values, ranks
+
+
+def merge_sources(a, b):
+    """Combine deux réductions de ``reduce_sources`` ; à rang égal, `a` l'emporte."""
+    (va, ra), (vb, rb) = a, b
+    index = va.index.union(vb.index)
+    va, ra, vb, rb = (x.reindex(index) for x in (va, ra, vb, rb))
+    take_b = (rb < ra) | (ra.isna() & rb.notna())
+    return va.mask(take_b, vb), ra.mask(take_b, rb)
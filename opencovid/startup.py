@@ -0,0 +1,63 @@
+"""Rapport du temps d'import au démarrage de l'application.
+
+    python -m opencovid.startup [--budget SECONDES] [--sections indicateurs ...] [--top N]
+
+Les modules importés au démarrage (streamlit et le chargement des données,
+plus les sections demandées) sont importés dans un interpréteur neuf lancé
+avec ``-X importtime``. Le rapport donne la durée d'import propre de
+chaque paquet de premier niveau (pandas, plotly, streamlit...). Si le total
+dépasse ``--budget``, le code de sortie est 1, ce qui permet de vérifier le
+démarrage en CI sur le conteneur.
+"""
+import argparse
+import collections
+import subprocess
+import sys
+
+from opencovid.sections import SECTIONS
+
+# imports de st_app.py avant toute section
+STARTUP_MODULES = ['streamlit', 'opencovid.sections', 'opencovid.service']
+
+
+def import_times(modules):
+    """Durées d'import (s) de `modules` dans un interpréteur neuf : {paquet: durée propre}, total."""
+    code = '; '.join('import ' + m for m in modules)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          stderr=subprocess.PIPE, universal_newlines=True)
+    lines = proc.stderr.splitlines()
+    if proc.returncode:
+        raise RuntimeError('import impossible :\n' + '\n'.join(l for l in lines if not l.startswith('import time:')))
+    packages = collections.Counter()
+    for line in lines:
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or line.endswith('imported package'):
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        # durée propre du module, attribuée à son paquet de premier niveau
+        packages[name.strip().split('.')[0]] += int(own) / 1e6
+    return packages, sum(packages.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', type=float, help='durée maximale (s) des imports de démarrage')
+    parser.add_argument('--sections', nargs='*', default=[], choices=[m for _, m in SECTIONS],
+                        help='sections à inclure (cases cochées)')
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    modules = STARTUP_MODULES + ['opencovid.sections.' + m for m in args.sections]
+    packages, total = import_times(modules)
+    print('imports : %s' % ', '.join(modules))
+    for name, seconds in packages.most_common(args.top):
+        print('%8.3f s  %s' % (seconds, name))
+    print('%8.3f s  total' % total)
+    if args.budget is not None and total > args.budget:
+        print('budget dépassé : %.3f s > %.3f s' % (total, args.budget))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Serveur HTTP local (avec Range) et fichiers amont de test qui grandissent d'un jour à l'autre."""
+import functools
+import http.server
+import os
+import re
+import threading
+
+import pandas as pd
+import pytest
+
+from opencovid import snapshot
+from opencovid.sources import SOURCES
+
+START = pd.Timestamp('2020-11-01')
+DEPS = {'01': 'Ain', '02': 'Aisne', '75': 'Paris'}
+
+
+class RangeHandler(http.server.SimpleHTTPRequestHandler):
+    """Fichiers du répertoire servis avec Range (bytes=N-) ; chaque requête est notée dans `server.requests`."""
+
+    def log_message(self, *args):
+        pass
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        match = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+        if self.command != 'GET' or not match or not self.server.ranges or not os.path.isfile(path):
+            self.server.requests.append((self.command, None, 200))
+            return super().send_head()
+        start, size = int(match.group(1)), os.path.getsize(path)
+        if start >= size:
+            self.server.requests.append((self.command, start, 416))
+            self.send_error(416)
+            return None
+        f = open(path, 'rb')
+        f.seek(start)
+        self.send_response(206)
+        self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, size - 1, size))
+        self.send_header('Content-Length', str(size - start))
+        self.send_header('Last-Modified', self.date_time_string(int(os.path.getmtime(path))))
+        self.end_headers()
+        self.server.requests.append((self.command, start, 206))
+        return f
+
+
+class Upstream:
+    """Fichiers amont servis en local ; `publish` en écrit une nouvelle version."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        handler = functools.partial(RangeHandler, directory=directory)
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.server.requests = []
+        self.server.ranges = True
+        self._mtime = 1600000000
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, name):
+        return 'http://127.0.0.1:%d/%s.csv' % (self.server.server_port, name)
+
+    def publish(self, name, df):
+        path = os.path.join(self.directory, name + '.csv')
+        df.to_csv(path, sep=SOURCES[name]['sep'], index=False)
+        # Last-Modified à la seconde : chaque version a la sienne
+        self._mtime += 60
+        os.utime(path, (self._mtime, self._mtime))
+        self.server.requests.clear()
+
+    def get_requests(self):
+        return [r for r in self.server.requests if r[0] == 'GET']
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def chiffres_cles(days, late=(), pending=()):
+    """Chiffres clés des `days` premiers jours : ministère puis ARS pour chaque jour.
+
+    Les lignes ARS des jours de `late` sont écrites à la fin du fichier, comme
+    quand elles arrivent après celles du ministère ; celles des jours de
+    `pending` ne sont pas encore publiées.
+    """
+    rows, tail = [], []
+    for i in range(days):
+        date = (START + pd.Timedelta(days=i)).strftime('%Y-%m-%d')
+        rows.append([date, 'pays', 'FRA', 'France', 1000 + i, 100 + i, 50, 500, 20, 5, None, 'ministere-sante'])
+        for code, nom in DEPS.items():
+            ministry = [date, 'departement', 'DEP-' + code, nom, None, 10 + i, 5, 40, 2, 1, None, 'ministere-sante']
+            ars = [date, 'departement', 'DEP-' + code, nom, 30 + i, 99, 6, 41, 3, 1, 200 + i,
+                   'agences-regionales-sante']
+            rows.append(ministry)
+            if i not in pending:
+                (tail if i in late else rows).append(ars)
+    columns = ['date', 'granularite', 'maille_code', 'maille_nom', 'cas_confirmes', 'deces', 'reanimation',
+               'hospitalises', 'nouvelles_hospitalisations', 'nouvelles_reanimations', 'gueris', 'source_type']
+    df = pd.DataFrame(rows + tail, columns=columns)
+    df.insert(len(columns) - 1, 'source_nom', df['source_type'])
+    return df
+
+
+def sidep_quot_dep(days):
+    """SI-DEP quotidien des `days` premiers jours, trié par jour."""
+    rows = []
+    for i in range(days):
+        jour = (START + pd.Timedelta(days=i)).strftime('%Y-%m-%d')
+        for code in DEPS:
+            for age in (0, 9, 90):
+                rows.append([code, jour, 3 + i % 5, 40 + i, age, 100000])
+    return pd.DataFrame(rows, columns=['dep', 'jour', 'P', 'T', 'cl_age90', 'pop'])
+
+
+@pytest.fixture
+def upstream(tmp_path, monkeypatch):
+    """Serveur amont local ; les sources et les snapshots pointent vers le répertoire de test."""
+    directory = tmp_path / 'upstream'
+    directory.mkdir()
+    server = Upstream(str(directory))
+    for name in SOURCES:
+        monkeypatch.setitem(SOURCES[name], 'url', server.url(name))
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_TTL', 0)
+    monkeypatch.setattr(snapshot, 'OFFLINE', False)
+    yield server
+    server.stop()
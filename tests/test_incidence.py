@@ -0,0 +1,41 @@
+"""Mise à jour des indicateurs glissants après remplacement des derniers jours."""
+import numpy as np
+import pandas as pd
+
+from opencovid import data
+from opencovid.incidence import METRICS, IncidenceEngine
+from tests.conftest import sidep_quot_dep
+
+
+def df_dep(days):
+    return data._prepare_sidep_quot_dep(sidep_quot_dep(days))
+
+
+def assert_same(a, b):
+    for area in b.areas:
+        pd.testing.assert_frame_equal(a.series(area), b.series(area))
+    assert a.version == b.version
+
+
+def test_update_adds_days():
+    engine = IncidenceEngine(df_dep(20)).update(df_dep(23))
+    assert_same(engine, IncidenceEngine(df_dep(23)))
+
+
+def test_update_follows_replaced_window_rows():
+    before = df_dep(20)
+    after = before.copy()
+    # lignes du dernier jour corrigées : même nombre de lignes, autres valeurs
+    after.loc[after['jour'] == after['jour'].max(), 'P'] += 7
+    engine = IncidenceEngine(before).update(after)
+    assert_same(engine, IncidenceEngine(after))
+    assert engine.version != IncidenceEngine(before).version
+
+
+def test_update_rebuilds_when_history_changes():
+    before = df_dep(20)
+    after = before[before['jour'] != before['jour'].min()]
+    engine = IncidenceEngine(before).update(after)
+    assert_same(engine, IncidenceEngine(after))
+    assert list(engine.days) == list(IncidenceEngine(after).days)
+    assert all(np.isfinite(engine.series('75')[m]).any() for m in METRICS)
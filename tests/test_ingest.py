@@ -0,0 +1,139 @@
+"""Ingestion incrémentale : Range, relecture complète, fichier raccourci, hors-ligne."""
+import pandas as pd
+import pytest
+
+from opencovid import data, profiling, snapshot
+from tests.conftest import chiffres_cles, sidep_quot_dep
+
+PREPARES = {'chiffres-cles': data._prepare_chiffres_cles, 'sidep-quot-dep': data._prepare_sidep_quot_dep}
+KEYS = {'chiffres-cles': ['date', 'maille_code'], 'sidep-quot-dep': ['dep', 'jour', 'cl_age90']}
+
+
+def load(name):
+    """(DataFrame, mode de chargement) de la source `name`."""
+    with profiling.profile() as records:
+        df = snapshot.load(name, PREPARES[name])
+    mode = [r['mode'] for r in records if r['stage'] == 'load.' + name][0]
+    return df, mode
+
+
+def rebuilt(name, tmp_path, monkeypatch):
+    """La source `name` relue entièrement, dans un snapshot neuf."""
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', str(tmp_path / 'rebuilt'))
+    df, mode = load(name)
+    assert mode == 'full'
+    return df
+
+
+def assert_same(name, a, b):
+    a, b = (df.sort_values(KEYS[name]).reset_index(drop=True) for df in (a, b))
+    pd.testing.assert_frame_equal(a, b, check_dtype=False, check_categorical=False)
+
+
+@pytest.mark.parametrize('name, make', [('chiffres-cles', chiffres_cles), ('sidep-quot-dep', sidep_quot_dep)])
+def test_range_append_equals_full_rebuild(upstream, tmp_path, monkeypatch, name, make):
+    upstream.publish(name, make(20))
+    assert load(name)[1] == 'full'
+    for days in (21, 22, 25):
+        upstream.publish(name, make(days))
+        df, mode = load(name)
+        assert mode == 'increment'
+        # une seule requête Range, pas de relecture du fichier
+        assert [status for _, _, status in upstream.get_requests()] == [206]
+    assert_same(name, df, rebuilt(name, tmp_path, monkeypatch))
+
+
+def test_range_reads_only_the_window(upstream):
+    upstream.publish('sidep-quot-dep', sidep_quot_dep(30))
+    load('sidep-quot-dep')
+    upstream.publish('sidep-quot-dep', sidep_quot_dep(31))
+    load('sidep-quot-dep')
+    (_, start, status), = upstream.get_requests()
+    size = len(sidep_quot_dep(31).to_csv(sep=';', index=False).encode())
+    # les 3 derniers jours connus et le jour ajouté, soit 4 jours sur 31
+    assert status == 206 and size - start < size * 5 / 31
+
+
+def test_late_rows_of_the_mark_day_are_merged(upstream, tmp_path, monkeypatch):
+    # les lignes ARS du dernier jour arrivent après celles du ministère
+    upstream.publish('chiffres-cles', chiffres_cles(10, pending={9}))
+    df, _ = load('chiffres-cles')
+    assert df.loc[(df['date'] == '2020-11-10') & (df['maille_code'] == 'DEP-75'), 'gueris'].isna().all()
+    upstream.publish('chiffres-cles', chiffres_cles(11, late={9}, pending={10}))
+    df, mode = load('chiffres-cles')
+    assert mode == 'increment'
+    assert [status for _, _, status in upstream.get_requests()] == [206]
+    assert (df.loc[(df['date'] == '2020-11-10') & (df['maille_code'] == 'DEP-75'), 'gueris'] == 209).all()
+    # le ministère reste prioritaire sur les décès
+    assert (df.loc[df['date'] == '2020-11-10', 'deces'].dropna() != 99).all()
+    assert_same('chiffres-cles', df, rebuilt('chiffres-cles', tmp_path, monkeypatch))
+
+
+def test_rewritten_file_is_reread_in_full(upstream, tmp_path, monkeypatch):
+    upstream.publish('sidep-quot-dep', sidep_quot_dep(20))
+    load('sidep-quot-dep')
+    # fichier réécrit (trié par département) : les octets connus ont bougé
+    upstream.publish('sidep-quot-dep', sidep_quot_dep(21).sort_values(['dep', 'jour']))
+    df, mode = load('sidep-quot-dep')
+    assert mode == 'increment'
+    assert [status for _, _, status in upstream.get_requests()] == [206, 200]
+    assert_same('sidep-quot-dep', df, rebuilt('sidep-quot-dep', tmp_path, monkeypatch))
+
+
+def test_server_without_range_is_reread_in_full(upstream, tmp_path, monkeypatch):
+    upstream.publish('sidep-quot-dep', sidep_quot_dep(20))
+    load('sidep-quot-dep')
+    upstream.server.ranges = False
+    upstream.publish('sidep-quot-dep', sidep_quot_dep(22))
+    df, mode = load('sidep-quot-dep')
+    assert mode == 'increment'
+    assert [status for _, _, status in upstream.get_requests()] == [200]
+    assert_same('sidep-quot-dep', df, rebuilt('sidep-quot-dep', tmp_path, monkeypatch))
+
+
+def test_shrunk_file_is_reread_in_full(upstream, tmp_path, monkeypatch):
+    upstream.publish('sidep-quot-dep', sidep_quot_dep(20))
+    load('sidep-quot-dep')
+    # fichier plus court que la position de la fenêtre : 416, puis relecture complète
+    upstream.publish('sidep-quot-dep', sidep_quot_dep(5))
+    df, mode = load('sidep-quot-dep')
+    assert [status for _, _, status in upstream.get_requests()] == [416, 200]
+    # les jours de la fenêtre suivent le fichier amont ; l'historique antérieur est gardé
+    assert mode == 'increment'
+    assert df['jour'].max() == pd.Timestamp('2020-11-17')
+    assert df['jour'].nunique() == 17
+    upstream.publish('sidep-quot-dep', sidep_quot_dep(21))
+    df, _ = load('sidep-quot-dep')
+    assert_same('sidep-quot-dep', df, rebuilt('sidep-quot-dep', tmp_path, monkeypatch))
+
+
+def test_offline_fallback_serves_the_snapshot(upstream, monkeypatch):
+    upstream.publish('sidep-quot-dep', sidep_quot_dep(20))
+    expected, _ = load('sidep-quot-dep')
+    upstream.stop()
+    df, mode = load('sidep-quot-dep')
+    assert mode == 'fallback'
+    pd.testing.assert_frame_equal(df, expected)
+    monkeypatch.setattr(snapshot, 'OFFLINE', True)
+    df, mode = load('sidep-quot-dep')
+    assert mode == 'snapshot'
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_offline_without_snapshot_fails(upstream):
+    upstream.stop()
+    with pytest.raises(OSError):
+        load('sidep-quot-dep')
+
+
+def test_compaction_removes_every_old_part(upstream, tmp_path, monkeypatch):
+    # des jours réécrits vident des fichiers de la fenêtre : numéros non contigus avant compaction
+    monkeypatch.setattr(snapshot, 'MAX_PARTS', 3)
+    upstream.publish('sidep-quot-dep', sidep_quot_dep(20))
+    load('sidep-quot-dep')
+    for days in range(21, 31):
+        upstream.publish('sidep-quot-dep', sidep_quot_dep(days))
+        df, mode = load('sidep-quot-dep')
+        assert mode == 'increment'
+        assert not df.duplicated(KEYS['sidep-quot-dep']).any()
+    assert_same('sidep-quot-dep', df, rebuilt('sidep-quot-dep', tmp_path, monkeypatch))
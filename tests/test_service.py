@@ -0,0 +1,79 @@
+"""Service de données : versions publiées, ouvertes sans copie, et republication sans changement."""
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks import synthetic
+from opencovid import data, profiling, service
+
+OPEN = '''
+import gc, json, sys
+from opencovid import profiling, service
+# première ouverture : imports et caches paresseux des bibliothèques
+opened = [service.open_dataset(sys.argv[2], sys.argv[1])]
+gc.collect()
+before = profiling.private_memory()
+opened.append(service.open_dataset(sys.argv[2], sys.argv[1]))
+gc.collect()
+print(json.dumps(profiling.private_memory() - before))
+'''
+
+
+@pytest.fixture
+def frames(upstream):
+    synthetic.write_all(upstream.directory, 0.5)
+    return data.load_frames()
+
+
+def read_only(series):
+    values = series.cat.codes if isinstance(series.dtype, pd.CategoricalDtype) else series
+    return not values.to_numpy().flags.writeable
+
+
+def test_opened_version_equals_the_built_dataset(frames, tmp_path):
+    current = service.publish(frames, str(tmp_path / 'data'))
+    built = data.build_dataset(frames)
+    opened = service.open_dataset(current['version'], str(tmp_path / 'data'))
+    for name in service.FRAMES:
+        expected, df = getattr(built, name).reset_index(drop=True), getattr(opened, name)
+        pd.testing.assert_frame_equal(df, expected, check_dtype=False, check_categorical=False)
+        # colonnes lues directement dans le fichier mappé
+        assert all(read_only(df[col]) for col in df.columns), name
+    for dep in built.cube.dep_codes:
+        pd.testing.assert_frame_equal(opened.cube.department(dep), built.cube.department(dep), check_dtype=False)
+        pd.testing.assert_frame_equal(opened.cube.department_by_age(dep), built.cube.department_by_age(dep),
+                                      check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(opened.cube.national('P'), built.cube.national('P'))
+    pd.testing.assert_frame_equal(opened.cube.departments, built.cube.departments, check_categorical=False)
+    assert opened.latest == built.latest
+    pd.testing.assert_frame_equal(opened.incidence.ranking(), built.incidence.ranking())
+    assert opened.incidence.version == built.incidence.version
+
+
+def test_opening_a_version_adds_little_private_memory(frames, tmp_path):
+    current = service.publish(frames, str(tmp_path / 'data'))
+    size = sum(df.memory_usage(deep=True).sum() for df in frames.values()) / 2 ** 20
+    # ouverture dans un processus neuf, comme un worker
+    out = subprocess.run([sys.executable, '-c', OPEN, str(tmp_path / 'data'), current['version']], check=True,
+                         capture_output=True, universal_newlines=True)
+    private_mb = json.loads(out.stdout.splitlines()[-1])
+    if np.isnan(private_mb):
+        pytest.skip('mémoire privée non mesurable ici')
+    # petits index (jours, départements) seulement, pas une copie des données
+    assert private_mb < 0.25 * size, (private_mb, size)
+
+
+def test_unchanged_sources_are_not_republished(upstream, tmp_path):
+    synthetic.write_all(upstream.directory, 0.2)
+    dataservice = service.DataService(root=str(tmp_path / 'data'), ttl=0)
+    first = dataservice._refresh(wait=True)
+    with profiling.profile() as records:
+        second = dataservice._refresh(wait=True)
+    # fichiers amont inchangés : la version courante est gardée, seule sa date est renouvelée
+    assert second['version'] == first['version']
+    assert second['published_at'] > first['published_at']
+    assert [r['skipped'] for r in records if r['stage'] == 'service.publish'] == [True]